@@ -1,43 +1,297 @@
 import os
+import argparse
 import json
 import asyncio
 import time
 import random
 from datetime import datetime, timezone
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from idea_model import recommendation_score
+from idea_store import get_store
+from event_log import get_event_log
+from rate_limit import RateLimiter
+from resilience import CircuitBreaker, ResilientCaller
+from json_stream import IncrementalObjectParser
+from dup_index import get_dup_index
+from scheduler import Pacer, TimerWheel, get_idea_queues
+from llm_cache import get_llm_cache, cache_key
+from leader import WORKER_LEASE, Lease
+from migrations import migrate_store
+import metrics
 
 load_dotenv()
 
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
+# Points the client at another endpoint, e.g. the local stand-in in gemini_standin.py
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 if GEMINI_KEY:
     try:
         from google import genai
         from google.genai import types
-        client = genai.Client(api_key=GEMINI_KEY)
+        client = genai.Client(
+            api_key=GEMINI_KEY,
+            http_options=types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None,
+        )
         USE_AI = True
     except ImportError:
         USE_AI = False
 else:
     USE_AI = False
 
-DATA_FILE = "ideas.json"
-EVENTS_FILE = "events.json"
+# Replay mode (LLM_REPLAY=1 or `python ai_worker.py --replay`) answers every
+# LLM call from the recorded llm_cache.db, with or without an API key
+if get_llm_cache().replay:
+    USE_AI = True
+
+MODEL = 'gemini-2.5-flash'
+# Generation config, as sent and as hashed into the cache key
+LLM_CONFIG = {"response_mime_type": "application/json"}
+MAX_IDEAS = 25
+# Below this many ideas the personas only generate; reviews start above it
+REVIEW_THRESHOLD = 15
+
+# Throughput knobs. The defaults are the demo trickle (roughly one action
+# every 10 s across all actors); AI_PACE_SECONDS=0 with AI_RPM / AI_TPM set to
+# the project's quota saturates it instead.
+# - AI_CONCURRENCY: LLM calls in flight at once
+# - AI_RPM / AI_TPM: requests / tokens per minute (0 = unlimited)
+# - AI_REVIEWERS: number of review consumers
+# - AI_REVIEW_BATCH: stale ideas reviewed per LLM request (1 = one by one)
+# - AI_PACE_SECONDS: "min-max" interval between the deadlines of each producer /
+#   reviewer's actions (see scheduler.Pacer)
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "2"))
+AI_RPM = int(os.getenv("AI_RPM", "10"))
+AI_TPM = int(os.getenv("AI_TPM", "250000"))
+AI_REVIEWERS = int(os.getenv("AI_REVIEWERS", "2"))
+AI_REVIEW_BATCH = max(1, int(os.getenv("AI_REVIEW_BATCH", "3")))
+_pace = [float(x) for x in os.getenv("AI_PACE_SECONDS", "60-120").split("-", 1)]
+AI_PACE_SECONDS = (_pace[0], _pace[-1])
+# "Thinking" pause shown between announcing an action and doing it
+THINK_SECONDS = 2
+# Output budget per call, for the token bucket's up-front estimate
+AI_OUTPUT_TOKENS = 2000
+# Stream generation and publish draft ideas while they are being written
+AI_STREAM = os.getenv("AI_STREAM", "1") not in ("", "0")
+# Interval of the batch near-duplicate sweep (new ideas are checked on insert)
+DEDUP_SWEEP_SECONDS = float(os.getenv("DEDUP_SWEEP_SECONDS", "300"))
+# Run the simulation inside the web processes too (app.py / streamlit_app.py),
+# leader-elected like standalone workers; 0 = they only read and
+# `python ai_worker.py` does the work
+EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "1") not in ("", "0")
+# Drafts not finished after this long (e.g. the worker died mid-stream) are dropped
+DRAFT_MAX_AGE_SECONDS = 600
+
+# Resilience of each LLM call (see resilience.ResilientCaller):
+# - LLM_TIMEOUT_SECONDS: deadline of one attempt
+# - LLM_RETRIES: extra attempts after a retryable error, with jittered backoff
+# - LLM_BREAKER_FAILURES / LLM_BREAKER_RESET_SECONDS: consecutive failed calls
+#   that open the breaker, and how long it stays open (the mocks stand in)
+# - LLM_HEDGE=1: send a second request once one runs past the recent p95
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "3"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "60"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "") not in ("", "0")
+
+llm_slots = asyncio.Semaphore(AI_CONCURRENCY)
+rate_limiter = RateLimiter(AI_RPM, AI_TPM)
+llm_caller = ResilientCaller(
+    timeout=LLM_TIMEOUT_SECONDS,
+    retries=LLM_RETRIES,
+    breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS),
+    hedge=LLM_HEDGE,
+)
+worker_lease = Lease(WORKER_LEASE)
+
+# Price per million tokens, for the cost estimate (defaults: gemini-2.5-flash
+# list prices in USD; thinking tokens are billed as output)
+LLM_PRICE_INPUT_PER_MTOK = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0.30"))
+LLM_PRICE_OUTPUT_PER_MTOK = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "2.50"))
+
+# --- Telemetry (scraped from /metrics, see metrics.py) ---
+LLM_CALLS = metrics.counter("llm_calls_total", "LLM calls by kind and outcome (ok, cached, error)", ("kind", "outcome"))
+LLM_CALL_SECONDS = metrics.histogram("llm_call_seconds", "LLM call latency including retries and backoff", ("kind",))
+LLM_ATTEMPT_SECONDS = metrics.histogram("llm_attempt_seconds", "Latency of each LLM round trip", ("kind", "outcome"))
+LLM_TOKENS = metrics.histogram("llm_tokens", "Tokens per LLM response, as reported by the API", ("kind", "direction"),
+                               buckets=metrics.TOKEN_BUCKETS)
+LLM_COST = metrics.counter("llm_cost_usd_total", "Estimated LLM spend from reported token usage", ("kind",))
+LLM_PARSE_FAILURES = metrics.counter("llm_parse_failures_total", "LLM responses that were not valid JSON", ("kind",))
+LLM_FALLBACKS = metrics.counter("llm_fallbacks_total", "Ideas generated / reviewed by the mock instead of the LLM", ("kind",))
+STORE_WRITE_SECONDS = metrics.histogram("store_write_seconds", "Duration of one idea store write", ("op",))
+STORE_WRITE_BYTES = metrics.histogram("store_write_bytes", "Serialized size of each idea written, per action", ("action",),
+                                      buckets=metrics.BYTE_BUCKETS)
+EVENT_APPEND_SECONDS = metrics.histogram("event_log_append_seconds", "Duration of one event log append")
+
+def record_usage(kind, usage):
+    """Token histograms and cost estimate from a response's usage_metadata."""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    output_tokens = (getattr(usage, "candidates_token_count", None) or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+    LLM_TOKENS.observe(prompt_tokens, kind=kind, direction="prompt")
+    LLM_TOKENS.observe(output_tokens, kind=kind, direction="output")
+    LLM_COST.inc((prompt_tokens * LLM_PRICE_INPUT_PER_MTOK + output_tokens * LLM_PRICE_OUTPUT_PER_MTOK) / 1e6, kind=kind)
+
+def parse_response(kind, text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        LLM_PARSE_FAILURES.inc(kind=kind)
+        raise
+
+async def call_llm(prompt, outputs=1, kind="", cached=True, on_fields=None):
+    """
+    One JSON-mode generate_content round trip, within the concurrency and
+    rate limits. Returns the parsed JSON. `outputs` is how many ideas the
+    response is expected to carry, for the token estimate.
+
+    Responses are recorded in the LLM cache under `kind`; with cached=True an
+    identical earlier request is answered from the cache instead. In replay
+    mode every call is answered from the recording.
+
+    With on_fields (and AI_STREAM on) the response is streamed and
+    `await on_fields(members, attempt)` is called with the top-level members
+    of the JSON object each chunk completes and the number of the attempt
+    they belong to: a retried stream starts its object over.
+    """
+    cache = get_llm_cache()
+    key = cache_key(MODEL, prompt, LLM_CONFIG)
+    if cached or cache.replay:
+        text = await run_io(cache.lookup, key, kind)
+        if text is not None:
+            LLM_CALLS.inc(kind=kind, outcome="cached")
+            return json.loads(text)
+        if cache.replay:
+            raise LookupError(f"no recorded {kind or 'LLM'} response to replay")
+
+    # Japanese prompts run at about one token per character
+    estimate = len(prompt) + AI_OUTPUT_TOKENS * outputs
+
+    async def attempt():
+        async with llm_slots:
+            await rate_limiter.acquire(estimate)
+            started = time.perf_counter()
+            try:
+                # Async client: the round trip must not stall the API's event loop
+                response = await client.aio.models.generate_content(
+                    model=MODEL,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(**LLM_CONFIG),
+                )
+            except BaseException:
+                LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, kind=kind, outcome="error")
+                raise
+            LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, kind=kind, outcome="ok")
+        usage = getattr(response, "usage_metadata", None)
+        rate_limiter.settle(estimate, getattr(usage, "total_token_count", None))
+        record_usage(kind, usage)
+        # Parsed inside the attempt: malformed JSON is retried, and never stored
+        return response.text, parse_response(kind, response.text)
+
+    streams = 0
+
+    async def streamed_attempt():
+        nonlocal streams
+        streams += 1
+        stream = streams
+        parser = IncrementalObjectParser()
+        text = ""
+        usage = None
+        async with llm_slots:
+            await rate_limiter.acquire(estimate)
+            started = time.perf_counter()
+            try:
+                stream = await client.aio.models.generate_content_stream(
+                    model=MODEL,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(**LLM_CONFIG),
+                )
+                async for chunk in stream:
+                    piece = chunk.text or ""
+                    text += piece
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    members = parser.feed(piece)
+                    if members:
+                        await on_fields(members, stream)
+            except BaseException:
+                LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, kind=kind, outcome="error")
+                raise
+            LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, kind=kind, outcome="ok")
+        rate_limiter.settle(estimate, getattr(usage, "total_token_count", None))
+        record_usage(kind, usage)
+        return text, parse_response(kind, text)
+
+    # Retries, deadline, hedging; raises CircuitOpenError while the upstream is unhealthy.
+    # Streams are not hedged: two of them would publish drafts over each other.
+    started = time.perf_counter()
+    try:
+        if on_fields is not None and AI_STREAM:
+            text, data = await llm_caller.call(streamed_attempt, hedge=False)
+        else:
+            text, data = await llm_caller.call(attempt)
+    except Exception:
+        LLM_CALLS.inc(kind=kind, outcome="error")
+        raise
+    finally:
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, kind=kind)
+    LLM_CALLS.inc(kind=kind, outcome="ok")
+    await run_io(cache.store, key, kind, MODEL, text)
+    return data
+
+def llm_stats():
+    """
+    Who holds the worker lease, plus this process's counters: resilience and
+    cache of the LLM layer, and near-duplicate suppression (all zero in a
+    process that is not the leader).
+    """
+    return {
+        "leader": worker_lease.current(),
+        "calls": llm_caller.stats(),
+        "cache": get_llm_cache().stats(),
+        "dedup": get_dup_index().stats(),
+    }
+
+def collect_worker_metrics():
+    """Scrape-time view of the counters kept by the LLM layer, the cache, dedup and the lease."""
+    stats = llm_stats()
+    calls, cache, dedup = stats["calls"], stats["cache"], stats["dedup"]
+    leader = stats["leader"]
+    return [
+        ("llm_resilience_events_total", "counter", "Retries, timeouts, failures, short circuits and hedges of LLM calls",
+         [({"event": k}, calls[k]) for k in ("retries", "timeouts", "failures", "short_circuited", "hedges", "hedge_wins")]),
+        ("llm_breaker_open", "gauge", "1 while the LLM circuit breaker is open or half-open",
+         [({}, int(calls["breaker_state"] != "closed"))]),
+        ("llm_breaker_opens_total", "counter", "Times the LLM circuit breaker opened", [({}, calls["breaker_opens"])]),
+        ("llm_cache_lookups_total", "counter", "LLM cache lookups by result",
+         [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+        ("llm_cache_evictions_total", "counter", "LLM cache entries evicted", [({}, cache["evictions"])]),
+        ("llm_cache_entries", "gauge", "Responses in the LLM cache", [({}, cache["entries"])]),
+        ("dedup_removed_total", "counter", "Near-duplicate ideas rejected at insert or removed by the sweep",
+         [({"stage": "insert"}, dedup["suppressed"]), ({"stage": "sweep"}, dedup["swept"])]),
+        ("worker_leader", "gauge", "1 if this process holds the worker lease",
+         [({}, int(leader is not None and leader["holder"] == worker_lease.holder))]),
+    ]
+
+metrics.add_collector(collect_worker_metrics)
+
+# Store and event-log writes go through this one thread, so SQLite commits and
+# segment appends never block the event loop the API is served from, and
+# they still happen in the order the loop issued them
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-worker-io")
+
+async def run_io(fn, *args):
+    """Runs a blocking store / event-log call on IO_EXECUTOR."""
+    return await asyncio.get_running_loop().run_in_executor(IO_EXECUTOR, fn, *args)
+
+# Nothing is pushed to SSE clients from here: the web processes follow the
+# store and the event log themselves (broadcast.StoreRelay), so it
+# does not matter which process the worker runs in.
 
 def log_event(message):
-    now = datetime.now(timezone.utc).isoformat()
-    events = []
-    if os.path.exists(EVENTS_FILE):
-        try:
-            with open(EVENTS_FILE, "r", encoding="utf-8") as f:
-                events = json.load(f)
-        except:
-            events = []
-    events.insert(0, {"timestamp": now, "message": message})
-    # Keep only last 50 events
-    events = events[:50]
-    with open(EVENTS_FILE, "w", encoding="utf-8") as f:
-        json.dump(events, f, indent=2, ensure_ascii=False)
+    with EVENT_APPEND_SECONDS.time():
+        get_event_log().append(message)
 
 PERSONAS = [
     {"role": "HR Specialist", "focus": "Employee engagement, talent management, training"},
@@ -49,17 +303,17 @@ PERSONAS = [
 ]
 
 def load_ideas():
-    if not os.path.exists(DATA_FILE):
-        return []
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
+    return get_store().all()
+
+def save_idea(idea, action="save"):
+    """Upserts the idea; `action` (draft, generate, review ...) labels the write metrics."""
+    STORE_WRITE_BYTES.observe(len(json.dumps(idea, ensure_ascii=False).encode("utf-8")), action=action)
+    with STORE_WRITE_SECONDS.time(op="upsert"):
+        get_store().upsert(idea)
 
-def save_ideas(ideas):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(ideas, f, indent=2, ensure_ascii=False)
+def remove_idea(idea):
+    with STORE_WRITE_SECONDS.time(op="delete"):
+        get_store().delete(idea["id"])
 
 MOCK_DATABASE = [
     {
@@ -345,6 +599,10 @@ def generate_idea_mock(persona):
 
     USED_MOCK_TITLES.add(base["title"])
 
+    return idea_from_template(base, idea_id, now)
+
+def idea_from_template(base, idea_id, now, rng=random):
+    """An idea from a MOCK_DATABASE entry; `rng` fills in what the template leaves open."""
     return {
         "id": idea_id,
         "persona": base["role"],
@@ -354,20 +612,20 @@ def generate_idea_mock(persona):
         "approach": base["approach"],
         "rationale": base["rationale"],
         "schedule": base["schedule"],
-        "difficulty": base.get("difficulty", random.choice([
+        "difficulty": base.get("difficulty", rng.choice([
             "低難易度（既存設定の応用のみで完結するため）",
             "中難易度（一部アドオン開発やAPI連携が必要なため）",
             "高難易度（要件定義での利害調整が難航しやすいため）",
             "高難易度（全社的な業務フロー是正が伴うため）"
         ])),
         "reference": base.get("reference", "https://help.sap.com/docs/SAP_SUCCESSFACTORS_RELEASE_INFORMATION"),
-        "recommendation_score": base.get("recommendation_score", random.randint(3, 5)),
+        "recommendation_score": base.get("recommendation_score", rng.randint(3, 5)),
         "cost": base["cost"],
         "created_at": now,
         "updated_at": now
     }
 
-def generate_idea_ai(persona):
+async def generate_idea_ai(persona):
     now = datetime.now(timezone.utc).isoformat()
     try:
         prompt = f"""
@@ -394,38 +652,72 @@ def generate_idea_ai(persona):
 
 JSONのフォーマットは厳密に守ってください。Markdownのコードブロックは使用しないでください。
 """
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-            ),
-        )
-        
-        data = json.loads(response.text)
         idea_id = str(uuid.uuid4())
-        return {
-            "id": idea_id,
-            "persona": persona["role"],
-            "title": data.get("title", f"Idea by {persona['role']}"),
-            "target": data.get("target", "未定"),
-            "modules": data.get("modules", "未定"),
-            "approach": data.get("approach", ""),
-            "rationale": data.get("rationale", ""),
-            "viewpoint": data.get("viewpoint", f"【{persona['role']}からの提案アピール】このアイディアは強力なROIを提供します。"),
-            "difficulty": data.get("difficulty", "未定"),
-            "reference": data.get("reference", ""),
-            "recommendation_score": data.get("recommendation_score", 3),
-            "schedule": data.get("schedule", {}),
-            "cost": data.get("cost", ""),
-            "created_at": now,
-            "updated_at": now
-        }
+        fields = {}
+        fields_attempt = None
+        draft_saved = False  # a draft is in the store (taken down if generation fails)
+        attempt_drafted = False  # ... and it was built from the current attempt
+
+        async def on_fields(members, attempt):
+            # A draft goes up once title and modules are known, and is
+            # refreshed whenever one of the long sections completes
+            nonlocal fields_attempt, draft_saved, attempt_drafted
+            if attempt != fields_attempt:
+                # A retried stream is a different answer: never mix two in a draft
+                fields.clear()
+                fields_attempt = attempt
+                attempt_drafted = False
+            fields.update(members)
+            if "title" not in fields or "modules" not in fields:
+                return
+            if attempt_drafted and not DRAFT_SECTIONS.intersection(members):
+                return
+            draft = idea_from_response(persona, fields, idea_id, now)
+            draft["draft"] = True
+            draft["updated_at"] = datetime.now(timezone.utc).isoformat()
+            await run_io(save_idea, draft, "draft")
+            draft_saved = attempt_drafted = True
+
+        try:
+            # Same persona, same prompt: a cached answer would only repeat an
+            # idea, so generation is recorded (for replay) but not served from cache
+            data = await call_llm(prompt, kind="generate", cached=False, on_fields=on_fields)
+        except Exception:
+            if draft_saved:
+                await run_io(remove_idea, {"id": idea_id})
+            raise
+        idea = idea_from_response(persona, data, idea_id, now)
+        # Newer than the drafts saved while streaming, which readers order by updated_at
+        idea["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return idea
     except Exception as e:
         print(f"Failed to generate AI idea: {e}")
+        LLM_FALLBACKS.inc(kind="generate")
         return generate_idea_mock(persona)
 
-def update_idea_ai(idea, reviewer_persona=None):
+# Sections whose completion refreshes a streamed draft
+DRAFT_SECTIONS = {"approach", "rationale", "schedule"}
+
+def idea_from_response(persona, data, idea_id, now):
+    return {
+        "id": idea_id,
+        "persona": persona["role"],
+        "title": data.get("title", f"Idea by {persona['role']}"),
+        "target": data.get("target", "未定"),
+        "modules": data.get("modules", "未定"),
+        "approach": data.get("approach", ""),
+        "rationale": data.get("rationale", ""),
+        "viewpoint": data.get("viewpoint", f"【{persona['role']}からの提案アピール】このアイディアは強力なROIを提供します。"),
+        "difficulty": data.get("difficulty", "未定"),
+        "reference": data.get("reference", ""),
+        "recommendation_score": data.get("recommendation_score", 3),
+        "schedule": data.get("schedule", {}),
+        "cost": data.get("cost", ""),
+        "created_at": now,
+        "updated_at": now
+    }
+
+async def update_idea_ai(idea, reviewer_persona=None):
     now = datetime.now(timezone.utc).isoformat()
     try:
         reviewer_intro = ""
@@ -457,31 +749,95 @@ def update_idea_ai(idea, reviewer_persona=None):
 - "schedule" (以前のスケジュール形式を維持しつつ調整)
 - "cost"
 """
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-            ),
-        )
-        data = json.loads(response.text)
-        idea["title"] = data.get("title", idea["title"])
-        idea["target"] = data.get("target", idea.get("target"))
-        idea["modules"] = data.get("modules", idea.get("modules"))
-        idea["approach"] = data.get("approach", idea["approach"])
-        idea["rationale"] = data.get("rationale", idea["rationale"])
-        idea["viewpoint"] = data.get("viewpoint", idea.get("viewpoint", ""))
-        idea["review_comment"] = data.get("review_comment", idea.get("review_comment", ""))
-        idea["difficulty"] = data.get("difficulty", idea.get("difficulty", ""))
-        idea["reference"] = data.get("reference", idea.get("reference", ""))
-        idea["recommendation_score"] = data.get("recommendation_score", idea.get("recommendation_score", 3))
-        idea["schedule"] = data.get("schedule", idea.get("schedule", {}))
-        idea["cost"] = data.get("cost", idea["cost"])
-        idea["updated_at"] = now
-        return idea
+        data = await call_llm(prompt, kind="review")
+        if not valid_review(data):
+            raise ValueError("review result lacks a title, approach or rationale, or a 1-5 score")
+        return apply_review(idea, data, now)
     except Exception as e:
+        print(f"Failed to review with AI, using mock review: {e}")
+        LLM_FALLBACKS.inc(kind="review")
         return update_idea_mock(idea, reviewer_persona)
 
+REVIEW_KEYS = ("title", "target", "modules", "approach", "rationale", "viewpoint", "review_comment",
+               "difficulty", "reference", "recommendation_score", "schedule", "cost")
+
+def apply_review(idea, data, now):
+    for key in REVIEW_KEYS:
+        if key in data:
+            idea[key] = data[key]
+    idea["updated_at"] = now
+    return idea
+
+def valid_review(data):
+    """A usable review result: title/approach/rationale present and a 1-5 score."""
+    if not isinstance(data, dict):
+        return False
+    for key in ("title", "approach", "rationale"):
+        if not isinstance(data.get(key), str) or not data[key].strip():
+            return False
+    score = data.get("recommendation_score")
+    return isinstance(score, int) and not isinstance(score, bool) and 1 <= score <= 5
+
+async def update_ideas_ai(ideas, reviewer_persona):
+    """
+    Reviews several ideas in one request. The instructions and the output
+    schema are sent once for the whole batch; the response is a JSON array
+    keyed by idea id. Entries that are missing or fail valid_review() fall
+    back to update_idea_mock for that idea only.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    results = {}
+    try:
+        blocks = []
+        for idea in ideas:
+            blocks.append(f"""
+[id: {idea['id']}]（提案者: {idea['persona']}）
+タイトル: {idea['title']}
+対象: {idea.get('target', '未定')}
+モジュール: {idea.get('modules', '未定')}
+アプローチ: {idea['approach']}
+根拠: {idea['rationale']}
+難易度: {idea.get('difficulty', '未定')}
+推奨度: {idea.get('recommendation_score', 3)}
+""")
+        prompt = f"""
+あなたは '{reviewer_persona['focus']}' を専門とする '{reviewer_persona['role']}' として、以下の{len(ideas)}件のビジネスアイデアをレビューする立場にあります。専門家の視点から厳しく指摘し、それぞれのプランをアップデートしてください。
+{"".join(blocks)}
+各アイデアを少しブラッシュアップしてください。抽象的な表現を避け、具体的なトラブル事例や業務課題（Fit to Standardの課題など）により深くフォーカスした詳細をアプローチ部分に追記してください。
+また、あなたのレビュー結果を反映し、難易度（difficulty）も必要に応じて再評価・説明を付加してください。
+言語は必ず**日本語**で記述してください。
+入力と同じ件数の要素を持つJSON配列のみを出力してください。各要素は以下のキーを含むオブジェクトです:
+- "id" (入力の id をそのまま記載)
+- "title"
+- "target"
+- "modules"
+- "approach"
+- "rationale"
+- "viewpoint" (既存のものがあれば保持)
+- "review_comment" (今回のあなたのレビューや事前指摘、追加アピールポイントを簡潔に記載してください)
+- "difficulty"
+- "reference"
+- "recommendation_score" (1〜5の整数で再評価)
+- "schedule" (以前のスケジュール形式を維持しつつ調整)
+- "cost"
+"""
+        data = await call_llm(prompt, outputs=len(ideas), kind="review_batch")
+        for entry in data if isinstance(data, list) else []:
+            if isinstance(entry, dict) and valid_review(entry):
+                results[str(entry.get("id"))] = entry
+    except Exception as e:
+        print(f"Failed batched review: {e}")
+
+    reviewed = []
+    for idea in ideas:
+        entry = results.get(idea["id"])
+        if entry is not None:
+            reviewed.append(apply_review(idea, entry, now))
+        else:
+            LLM_FALLBACKS.inc(kind="review_batch")
+            reviewed.append(update_idea_mock(idea, reviewer_persona))
+    return reviewed
+
 def update_idea_mock(idea, reviewer_persona=None):
     now = datetime.now(timezone.utc).isoformat()
     details = [
@@ -499,80 +855,260 @@ def update_idea_mock(idea, reviewer_persona=None):
     idea["updated_at"] = now
     return idea
 
-async def run_ai_simulation():
-    log_event("AIシミュレーションを開始しました。")
-    print(f"Starting AI Simulation loop. USE_AI: {USE_AI}")
+# --- Pipeline -------------------------------------------------------------
+# Every persona is an independent producer and AI_REVIEWERS consumers review
+# the oldest ideas; LLM calls are bounded by llm_slots and rate_limiter.
+# Anything that reads-then-writes the store runs as one function on the
+# single IO_EXECUTOR thread, so concurrent actors cannot overshoot MAX_IDEAS
+# or evict the same idea twice.
+
+def count_finished_ideas():
+    """Ideas in the store, not counting drafts still being streamed."""
+    return get_idea_queues().count()
+
+def oldest_ideas(k, exclude):
+    """The k least recently updated finished ideas whose ids are not in exclude."""
+    return get_store().get_many(get_idea_queues().oldest(k, exclude))
+
+def tidy_ideas():
+    """
+    Drops duplicate titles (keeping the newest), ideas scored below 4 and
+    abandoned drafts. The IdeaQueues hand over exactly those, so this costs
+    the number of ideas dropped, not the number stored.
+    """
+    queues = get_idea_queues()
+    draft_cutoff = datetime.fromtimestamp(time.time() - DRAFT_MAX_AGE_SECONDS, timezone.utc).isoformat()
+    dropped = set(queues.drafts_before(draft_cutoff))
+    dropped.update(queues.below_score(4))
+    dropped.update(queues.title_duplicates())
+    for idea_id in dropped:
+        remove_idea({"id": idea_id})
+
+def sweep_near_duplicates():
+    """
+    Batch sweep for near-duplicates that slipped past the insert-time check
+    (e.g. two ideas converging through reviews): LSH finds the groups
+    without comparing all pairs, and the newest of each group is kept.
+    """
+    dup_index = get_dup_index()
+    for group in dup_index.sweep():
+        ideas = sorted(get_store().get_many(group), key=lambda x: x.get("updated_at", ""), reverse=True)
+        for item in ideas[1:]:
+            remove_idea(item)
+            log_event(f"【System】ほぼ重複するアイディア「{item['title']}」を整理しました。")
+            dup_index.swept += 1
+
+def commit_new_idea(idea, persona_role, replace=False):
+    """
+    Saves a newly generated idea, evicting the lowest-priority one when full.
+    A near-duplicate of stored ideas is rejected unless it scores higher
+    than all of them, in which case it replaces them. Returns False if
+    rejected.
+    """
+    dup_index = get_dup_index()
+    similarities = dict(dup_index.find(idea))
+    others = get_store().get_many(similarities)
+    if others:
+        score = recommendation_score(idea.get("recommendation_score"))
+        # Highest score first, most similar first among equals
+        best = max(others, key=lambda o: (recommendation_score(o.get("recommendation_score")), similarities[o["id"]]))
+        if score <= recommendation_score(best.get("recommendation_score")):
+            dup_index.suppressed += 1
+            # Take down the streamed draft, if there was one
+            remove_idea(idea)
+            log_event(f"【System】「{idea['title']}」は既存の「{best['title']}」とほぼ重複"
+                      f"（類似度 {similarities[best['id']]:.0%}）のため破棄しました。")
+            return False
+        for other in others:
+            remove_idea(other)
+            log_event(f"【System】「{other['title']}」をほぼ重複する高評価の新案「{idea['title']}」で置き換えました。")
+    tidy_ideas()
+    queues = get_idea_queues()
+    if replace or queues.count() >= MAX_IDEAS:
+        # Lowest score first, oldest first among equals
+        victim_id = queues.lowest_priority()
+        removed = get_store().get(victim_id) if victim_id else None
+        if removed is not None:
+            remove_idea(removed)
+            log_event(f"【System】優先度の低いアイディア「{removed['title']}」を破棄し、整理しました。")
+    save_idea(idea, "generate")
+    log_event(f"【{persona_role}】が新しいアイディア「{idea['title']}」を提出しました！")
+    return True
+
+def commit_review(idea, reviewer_role):
+    if get_store().get(idea["id"]) is None:
+        # Evicted while the review was in flight
+        return False
+    save_idea(idea, "review")
+    log_event(f"【{reviewer_role}】がレビューを反映し、プランがアップデートされました！")
+    return True
+
+async def persona_producer(persona, wheel):
+    pacer = Pacer(wheel, AI_PACE_SECONDS)
+    # Stagger the start so the personas do not all fire at once
+    await wheel.sleep_until(asyncio.get_running_loop().time() + random.uniform(0, min(5, AI_PACE_SECONDS[1])))
     while True:
         try:
-            ideas = load_ideas()
-            
-            # Deduplicate by title (keep newest) and cull low priority
-            ideas.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
-            unique_titles = set()
-            filtered_ideas = []
-            for item in ideas:
-                score = item.get("recommendation_score", 3)
-                title = item.get("title", "")
-                if score >= 4 and title not in unique_titles:
-                    unique_titles.add(title)
-                    filtered_ideas.append(item)
-            
-            ideas = filtered_ideas
-            
-            MAX_IDEAS = 25
-            action = "generate"
-            if len(ideas) >= MAX_IDEAS:
-                action = random.choice(["replace", "update", "update", "update"])
-            elif len(ideas) >= 15:
-                action = random.choice(["generate", "update", "update"])
-                
-            if action in ["generate", "replace"]:
-                persona = random.choice(PERSONAS)
-                
-                if action == "replace" or len(ideas) >= MAX_IDEAS:
-                    # Sort primarily by score ascending, secondarily by updated_at ascending (oldest score first)
-                    ideas.sort(key=lambda x: (x.get("recommendation_score", 4), x.get("updated_at", "")))
-                    if ideas:
-                        removed = ideas.pop(0)
-                        log_event(f"【System】優先度の低いアイディア「{removed['title']}」を破棄し、整理しました。")
-                        await asyncio.sleep(1)
+            count = await run_io(count_finished_ideas)
+            replace = False
+            if count >= MAX_IDEAS:
+                replace = random.random() < 0.25
+                act = replace
+            elif count >= REVIEW_THRESHOLD:
+                act = random.random() < 1 / 3
+            else:
+                act = True
 
+            if act:
                 print(f"AI Worker: Generating new idea as {persona['role']}...")
-                log_event(f"【{persona['role']}】が新規アイディアを考案中です...")
-                
+                await run_io(log_event, f"【{persona['role']}】が新規アイディアを考案中です...")
+
                 # simulate thinking
-                await asyncio.sleep(2)
-                
+                await asyncio.sleep(THINK_SECONDS)
+
                 if USE_AI:
-                    new_idea = generate_idea_ai(persona)
+                    new_idea = await generate_idea_ai(persona)
                 else:
                     new_idea = generate_idea_mock(persona)
-                ideas.insert(0, new_idea)
-                save_ideas(ideas)
-                log_event(f"【{persona['role']}】が新しいアイディア「{new_idea['title']}」を提出しました！")
-            else:
-                if ideas:
-                    ideas.sort(key=lambda x: x.get("updated_at", ""))
-                    target_idea = ideas[0]
-                    persona_role = target_idea['persona']
-                    
-                    possible_reviewers = [p for p in PERSONAS if p['role'] != persona_role]
-                    reviewer_persona = random.choice(possible_reviewers) if possible_reviewers else persona_role
-                    reviewer_role = reviewer_persona['role'] if isinstance(reviewer_persona, dict) else reviewer_persona
-
-                    print(f"AI Worker: {reviewer_role} is reviewing idea '{target_idea['title']}'...")
-                    
-                    log_event(f"【{reviewer_role}】が【{persona_role}】のアイディア「{target_idea['title']}」をレビューしています...")
-                    await asyncio.sleep(2)
-                    
-                    if USE_AI:
-                        target_idea = update_idea_ai(target_idea, reviewer_persona)
-                    else:
-                        target_idea = update_idea_mock(target_idea, reviewer_persona)
-                    save_ideas(ideas)
-                    log_event(f"【{reviewer_role}】がレビューを反映し、プランがアップデートされました！")
-                    
-            await asyncio.sleep(random.randint(10, 20))
+                await run_io(commit_new_idea, new_idea, persona["role"], replace)
+            await pacer.wait()
         except Exception as e:
-            print(f"Error in AI loop: {e}")
+            print(f"Error in {persona['role']} producer: {e}")
             await asyncio.sleep(10)
+
+async def review_consumer(reviewing, wheel):
+    """
+    Reviews the AI_REVIEW_BATCH oldest ideas nobody else is reviewing;
+    `reviewing` is shared between consumers.
+    """
+    pacer = Pacer(wheel, AI_PACE_SECONDS)
+    await wheel.sleep_until(asyncio.get_running_loop().time() + random.uniform(0, min(5, AI_PACE_SECONDS[1])))
+    while True:
+        try:
+            if await run_io(count_finished_ideas) >= REVIEW_THRESHOLD:
+                batch = await run_io(oldest_ideas, AI_REVIEW_BATCH, set(reviewing))
+                if batch:
+                    reviewing.update(i["id"] for i in batch)
+                    try:
+                        await review_ideas(batch)
+                    finally:
+                        reviewing.difference_update(i["id"] for i in batch)
+            await pacer.wait()
+        except Exception as e:
+            print(f"Error in review consumer: {e}")
+            await asyncio.sleep(10)
+
+async def dedup_sweeper(wheel):
+    pacer = Pacer(wheel, (DEDUP_SWEEP_SECONDS, DEDUP_SWEEP_SECONDS))
+    while True:
+        await pacer.wait()
+        try:
+            await run_io(sweep_near_duplicates)
+        except Exception as e:
+            print(f"Error in near-duplicate sweep: {e}")
+
+async def review_ideas(batch):
+    # One reviewer for the whole batch, preferring someone who wrote none of it
+    authors = {idea['persona'] for idea in batch}
+    possible_reviewers = [p for p in PERSONAS if p['role'] not in authors] or PERSONAS
+    reviewer_persona = random.choice(possible_reviewers)
+    reviewer_role = reviewer_persona['role']
+
+    for idea in batch:
+        print(f"AI Worker: {reviewer_role} is reviewing idea '{idea['title']}'...")
+        await run_io(log_event, f"【{reviewer_role}】が【{idea['persona']}】のアイディア「{idea['title']}」をレビューしています...")
+    await asyncio.sleep(THINK_SECONDS)
+
+    if not USE_AI:
+        reviewed = [update_idea_mock(idea, reviewer_persona) for idea in batch]
+    elif len(batch) == 1:
+        reviewed = [await update_idea_ai(batch[0], reviewer_persona)]
+    else:
+        reviewed = await update_ideas_ai(batch, reviewer_persona)
+    for idea in reviewed:
+        await run_io(commit_review, idea, reviewer_role)
+
+async def run_ai_simulation():
+    await run_io(log_event, "AIシミュレーションを開始しました。")
+    print(f"Starting AI Simulation loop. USE_AI: {USE_AI}, concurrency: {AI_CONCURRENCY}, "
+          f"rpm: {AI_RPM}, tpm: {AI_TPM}, reviewers: {AI_REVIEWERS} x{AI_REVIEW_BATCH}, pace: {AI_PACE_SECONDS}")
+    reviewing = set()
+    wheel = TimerWheel()
+    await asyncio.gather(
+        *(persona_producer(persona, wheel) for persona in PERSONAS),
+        *(review_consumer(reviewing, wheel) for _ in range(AI_REVIEWERS)),
+        dedup_sweeper(wheel),
+    )
+
+async def run_as_leader():
+    """
+    Runs the simulation only while this process holds the worker lease, so
+    exactly one runs per ideas database however many web processes and
+    standalone workers are started; the others stand by and take over
+    within WORKER_LEASE_SECONDS of the leader dying.
+    """
+    standing_by = False
+    while True:
+        if await run_io(worker_lease.try_acquire):
+            print(f"AI Worker: {worker_lease.holder} holds the worker lease.")
+            standing_by = False
+            # Nobody else writes while we hold the lease: bring the data up to date first
+            migrated = await run_io(migrate_store, get_store(), worker_lease)
+            if migrated["to"] != migrated["from"]:
+                print(f"AI Worker: migrated the store from version {migrated['from']} to {migrated['to']} "
+                      f"({migrated['changed']} of {migrated['scanned']} ideas changed).")
+            simulation = asyncio.ensure_future(run_ai_simulation())
+            try:
+                while not simulation.done():
+                    await asyncio.wait([simulation], timeout=worker_lease.ttl / 3)
+                    if not simulation.done() and not await run_io(worker_lease.try_acquire):
+                        print("AI Worker: lost the worker lease, stopping.")
+                        break
+                if simulation.done() and simulation.exception():
+                    print(f"AI Worker: simulation failed: {simulation.exception()}")
+            finally:
+                simulation.cancel()
+                await asyncio.gather(simulation, return_exceptions=True)
+                await run_io(worker_lease.release)
+        elif not standing_by:
+            holder = (worker_lease.current() or {}).get("holder")
+            print(f"AI Worker: standing by, the worker lease is held by {holder}.")
+            standing_by = True
+        await asyncio.sleep(worker_lease.ttl / 3)
+
+async def run_for(duration):
+    """Runs the simulation (as leader), for `duration` seconds if given."""
+    try:
+        await asyncio.wait_for(run_as_leader(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the idea worker on its own.")
+    parser.add_argument("--replay", action="store_true",
+                        help="answer every LLM call from the recorded llm_cache.db (offline, deterministic)")
+    parser.add_argument("--fast", action="store_true", help="no pacing, thinking pauses or rate limits")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds and print stats")
+    parser.add_argument("--seed", type=int, help="seed for the persona / reviewer choices")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port at /metrics")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.replay:
+        get_llm_cache().replay = True
+        USE_AI = True
+    if args.fast:
+        AI_PACE_SECONDS = (0, 0)
+        THINK_SECONDS = 0
+        rate_limiter = RateLimiter(0, 0)
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    started = time.monotonic()
+    asyncio.run(run_for(args.duration))
+    stats = get_llm_cache().stats()
+    print(f"Ran {time.monotonic() - started:.1f}s, {get_store().count()} ideas, revision {get_store().revision()}. "
+          f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+          f"{stats['entries']} entries")
@@ -1,82 +1,333 @@
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import json
 import os
-from ai_worker import run_ai_simulation
+import time
+from ai_worker import EMBEDDED_WORKER, run_as_leader, llm_stats
+from idea_store import get_store, DETAIL_FIELDS
+from idea_index import get_index
+from search_index import get_search_index, snippet
+from event_log import get_event_log
+from snapshot_cache import SnapshotCache
+from broadcast import StoreRelay, get_broadcaster, format_sse
+import metrics
 
-# Background task reference
-bg_task = None
+DEFAULT_EVENT_LIMIT = 50
+
+# Parsed + pre-serialized views of the store and the event log, rebuilt only
+# when their version changes so that polling turns into memory lookups
+ideas_cache = SnapshotCache(lambda: get_store().version(), lambda: get_store().all())
+events_cache = SnapshotCache(lambda: get_event_log().version(), lambda: get_event_log().latest(DEFAULT_EVENT_LIMIT))
+
+# Background task references
+bg_tasks = []
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global bg_task
-    # Start the AI Simulation loop in the background
-    bg_task = asyncio.create_task(run_ai_simulation())
+    # SSE clients of this process are fed from the store, wherever the worker runs
+    relay = StoreRelay(get_broadcaster(), get_store(), get_event_log())
+    bg_tasks.append(asyncio.create_task(relay.run()))
+    if EMBEDDED_WORKER:
+        # Every uvicorn worker is a candidate; the lease lets only one simulate
+        bg_tasks.append(asyncio.create_task(run_as_leader()))
     yield
     # Cleanup
-    if bg_task:
-        bg_task.cancel()
+    for task in bg_tasks:
+        task.cancel()
+    await asyncio.gather(*bg_tasks, return_exceptions=True)
 
 app = FastAPI(lifespan=lifespan)
 
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_seconds", "API latency by route (to the first byte for streams)", ("method", "route", "status")
+)
+
+def collect_store_metrics():
+    store = get_store()
+    return [
+        ("ideas", "gauge", "Ideas in the store, drafts included", [({}, store.count())]),
+        ("store_revision", "counter", "Store revision (one per committed write)", [({}, store.revision())]),
+    ]
+
+metrics.add_collector(collect_store_metrics)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # The route template, not the raw path, keeps /api/ideas/{idea_id} one series
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route, status=status)
+
 # Mount the static directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            q = 1.0
+        if q > 0:
+            accepted.add(token.strip().lower())
+    return accepted
+
+def snapshot_response(request, snap):
+    """
+    Serves a cached snapshot: 304 if the client already has it, otherwise the
+    smallest precompressed body the client accepts.
+    """
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    # Each encoding is its own representation, hence its own strong ETag,
+    # but any of them proves the client already holds this snapshot.
+    if_none_match = request.headers.get("if-none-match", "")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"').split("-")[0] == snap.etag:
+            headers["ETag"] = f'"{snap.etag}"'
+            return Response(status_code=304, headers=headers)
+
+    accepted = _accepted_encodings(request)
+    if snap.br is not None and "br" in accepted:
+        body, encoding = snap.br, "br"
+    elif "gzip" in accepted:
+        body, encoding = snap.gzip, "gzip"
+    else:
+        body, encoding = snap.body, None
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f'"{snap.etag}-{encoding}"'
+    else:
+        headers["ETag"] = f'"{snap.etag}"'
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.get("/")
 def read_root():
     from fastapi.responses import FileResponse
     return FileResponse("static/index.html")
 
+MAX_PAGE_SIZE = 500
+
 @app.get("/api/ideas")
-def get_ideas():
+def get_ideas(
+    request: Request,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: str = "full",
+    target: Optional[str] = None,
+    module: Optional[str] = None,
+    audience: Optional[str] = None,
+    persona: Optional[str] = None,
+    sort: str = "default",
+):
+    """
+    Without parameters: every idea, served from the snapshot cache.
+    With limit/cursor: one page, the cursor for the next page is returned in
+    X-Next-Cursor.
+    target/module/audience/persona filter on exact facet values and sort is
+    "default" (newest first), "desc" or "asc" (by recommendation score); both
+    are answered from the in-memory inverted indexes.
+    fields=summary leaves out approach, rationale and schedule (see
+    /api/ideas/{id} for the full detail).
+    Ideas the worker is still streaming carry "draft": true and are updated
+    in place (same id) until the finished idea replaces them.
+    """
+    try:
+        if fields not in ("summary", "full"):
+            return JSONResponse({"error": "fields must be 'summary' or 'full'"}, status_code=400)
+        filters = {"target": target, "module": module, "audience": audience, "persona": persona}
+        filtered = any(v is not None for v in filters.values()) or sort != "default"
+        if limit is None and cursor is None and fields == "full" and not filtered:
+            # snapshot is sorted by updated_at descending by the store
+            snap = ideas_cache.get()
+            response = snapshot_response(request, snap)
+            response.headers["X-Revision"] = str(snap.version)
+            return response
+
+        store = get_store()
+        revision = store.revision()
+        limit = max(1, min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE))
+        try:
+            if filtered:
+                ids, next_cursor = get_index().query(sort=sort, limit=limit, cursor=cursor, **filters)
+                ideas = store.get_many(ids, fields)
+            else:
+                # Plain newest-first listing pages straight off the (updated_at, id) index
+                ideas, next_cursor = store.page(limit, cursor, fields)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        headers = {"X-Revision": str(revision)}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return JSONResponse(ideas, headers=headers)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/facets")
+def get_facets():
+    """
+    Filter options with counts, from the incrementally maintained indexes:
+    {"target": [{"value", "count"}], "module": [...], "audience": [...], "persona": [...]}
+    """
+    try:
+        index = get_index()
+        facets = index.facets()
+        return JSONResponse(facets, headers={"X-Revision": str(index.revision)})
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/ideas/changes")
+def get_idea_changes(since: int):
+    """
+    Delta sync: {"revision", "reset", "changed": [ideas], "removed": [ids]}
+    for everything that happened after revision `since`. On reset=True the
+    client must reload /api/ideas.
+    """
+    try:
+        return JSONResponse(get_store().changes(since))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/ideas/{idea_id}")
+def get_idea(idea_id: str):
+    """
+    Full detail of one idea (schedule, approach, rationale ...).
+    """
     try:
-        if not os.path.exists("ideas.json"):
-            return JSONResponse([])
-        with open("ideas.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        # return sorted by updated_at descending natively
-        data.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
-        return JSONResponse(data)
+        idea = get_store().get(idea_id)
+        if idea is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return JSONResponse(idea)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+@app.get("/api/search")
+def search(
+    q: str,
+    limit: int = 20,
+    target: Optional[str] = None,
+    module: Optional[str] = None,
+    audience: Optional[str] = None,
+    persona: Optional[str] = None,
+):
+    """
+    Full-text search over title, approach, rationale and review_comment,
+    optionally narrowed by the same facet filters as /api/ideas.
+    Returns {"query", "results": [{"idea": <summary>, "score", "snippet"}]},
+    best BM25 score first; snippets are HTML with the matches in <mark>.
+    """
+    try:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = {"target": target, "module": module, "audience": audience, "persona": persona}
+        if any(v is not None for v in filters.values()):
+            allowed = set(get_index().query(**filters)[0])
+            ranked = [r for r in get_search_index().search(q, None) if r[0] in allowed][:limit]
+        else:
+            ranked = get_search_index().search(q, limit)
+        # Full ideas, since the snippet may come from approach or rationale
+        ideas = {idea["id"]: idea for idea in get_store().get_many([idea_id for idea_id, _ in ranked])}
+        results = []
+        for idea_id, score in ranked:
+            idea = ideas.get(idea_id)
+            if idea is None:
+                continue
+            results.append({
+                "idea": {k: v for k, v in idea.items() if k not in DETAIL_FIELDS},
+                "score": round(score, 4),
+                "snippet": snippet(idea, q),
+            })
+        return JSONResponse({"query": q, "results": results})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 @app.get("/api/check_updates")
-def check_updates(last_timestamp: str):
+def check_updates(since_revision: Optional[int] = None, last_timestamp: Optional[str] = None):
     """
-    Returns {"has_updates": True/False} based on whether any idea in ideas.json
-    has an updated_at > last_timestamp.
+    Returns {"has_updates": True/False, "revision": <current store revision>}.
+    With since_revision this is a single counter comparison, and it also
+    catches deletions. last_timestamp is kept for older clients and compares
+    against the newest updated_at only.
     """
     try:
-        if not os.path.exists("ideas.json"):
-            return JSONResponse({"has_updates": False})
-        with open("ideas.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            
-        for idea in data:
-            if idea.get("updated_at", "") > last_timestamp:
-                return JSONResponse({"has_updates": True})
-                
-        return JSONResponse({"has_updates": False})
+        if since_revision is not None:
+            revision = get_store().revision()
+            return JSONResponse({"has_updates": revision > since_revision, "revision": revision})
+        snap = ideas_cache.get()
+        ideas = snap.data
+        # Sorted newest first, so only the head needs comparing
+        has_updates = bool(ideas) and ideas[0].get("updated_at", "") > (last_timestamp or "")
+        return JSONResponse({"has_updates": has_updates, "revision": snap.version})
     except Exception as e:
         return JSONResponse({"has_updates": False})
 
 @app.get("/api/events")
-def get_events():
+def get_events(request: Request, limit: int = DEFAULT_EVENT_LIMIT):
     """
-    Returns the latest event history logs.
+    Returns the latest event history logs, newest first.
     """
     try:
-        if not os.path.exists("events.json"):
-            return JSONResponse([])
-        with open("events.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return JSONResponse(data)
+        if limit == DEFAULT_EVENT_LIMIT:
+            return snapshot_response(request, events_cache.get())
+        return JSONResponse(get_event_log().latest(limit))
     except Exception as e:
         return JSONResponse([])
 
+@app.get("/api/worker/stats")
+def worker_stats():
+    """
+    LLM layer health: circuit breaker state, retry / timeout / hedge counts,
+    LLM cache hits and misses, and near-duplicates suppressed. The counters
+    are this process's; "leader" names the process holding the worker lease.
+    """
+    return JSONResponse(llm_stats())
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text format: API latency per route, plus (in the process
+    running the worker) LLM latency, tokens, cost, parse failures, mock
+    fallbacks and store write duration / bytes per action.
+    """
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/stream")
+async def stream(request: Request):
+    """
+    Server-Sent Events push channel: idea-changed, idea-removed and new-event
+    messages relayed from the store and the event log (within SSE_POLL_SECONDS
+    of the worker writing them), resumable via Last-Event-ID. A "reset" message
+    means the client missed too much and should reload.
+    """
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+
+    async def event_source():
+        async for message in get_broadcaster().subscribe(last_event_id):
+            if await request.is_disconnected():
+                break
+            yield format_sse(message)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
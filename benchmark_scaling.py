@@ -0,0 +1,406 @@
+"""
+Scaling benchmark over synthetic corpora (corpus.py), by default of 100,
+10k and 100k ideas. MAX_IDEAS keeps the live store small, so this is where
+the O(n) paths show. Each size runs in a fresh process and scratch
+directory, and measures
+
+- corpus: generation time, file size, and loading it into the store
+- migrations: migrations.migrate_file on the corpus file and
+  migrations.migrate_store on the loaded store
+- api: /api/ideas (full snapshot, gzip, summary page, facet-filtered page),
+  /api/check_updates (revision and legacy timestamp) and /api/events.
+  Latency is taken three ways: the process's first request (indexes and
+  caches built from scratch), the first request after a store write, and
+  p50/p95 over --repeat requests. The payload is measured in bytes as sent.
+- streamlit: one cold and one warm run of streamlit_app.py (AppTest)
+- worker: building the worker's queues and near-duplicate index, then one
+  simulation cycle (a producer commit with its tidy, plus a review batch;
+  mock LLM), measured first and then as p50 over --repeat cycles, and one
+  near-duplicate sweep
+- peak RSS of the process
+
+Results go to a JSON file named after the commit, so two commits can be
+diffed with --compare:
+
+    python benchmark_scaling.py --sizes 100,10000,100000 --repeat 20
+    python benchmark_scaling.py --compare benchmark-<before>.json benchmark-<after>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = "100,10000,100000"
+# Ideas per store transaction while loading a corpus
+LOAD_BATCH = 500
+STREAMLIT_TIMEOUT_SECONDS = 1800
+
+API_CASES = [
+    # (name, path, Accept-Encoding)
+    ("ideas", "/api/ideas", "identity"),
+    ("ideas_gzip", "/api/ideas", "gzip"),
+    ("ideas_summary_page", "/api/ideas?limit=50&fields=summary", "identity"),
+    ("ideas_filtered_page", "/api/ideas?persona=HR%20Specialist&sort=desc&limit=50", "identity"),
+    ("check_updates", "/api/check_updates?since_revision=1", "identity"),
+    ("check_updates_legacy", "/api/check_updates?last_timestamp=2024-06-01T00:00:00%2B00:00", "identity"),
+    ("events", "/api/events", "identity"),
+    ("events_200", "/api/events?limit=200", "identity"),
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def timed(fn, *args):
+    """(fn(*args), seconds it took)."""
+    started = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - started
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+# --- One size, in a child process whose settings point into the scratch directory ---
+
+def load_corpus(path, store):
+    """Streams the corpus file into the store, LOAD_BATCH ideas per transaction."""
+    from json_stream import iter_array
+
+    batch = []
+    with open(path, "r", encoding="utf-8") as f:
+        for idea in iter_array(f):
+            batch.append(idea)
+            if len(batch) >= LOAD_BATCH:
+                store.upsert_many(batch)
+                batch = []
+    if batch:
+        store.upsert_many(batch)
+
+
+def touch(store, event_log):
+    """One store write and one event, so the next request finds its caches stale."""
+    idea = store.page(1)[0][0]
+    idea["updated_at"] = datetime.now(timezone.utc).isoformat()
+    store.upsert(idea)
+    event_log.append("benchmark write")
+
+
+def measure_api(store, event_log, repeat):
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:
+        return {"skipped": str(e)}
+    import app
+
+    # Not entered as a context manager: the lifespan (store relay, embedded
+    # worker) stays off and only the request path is measured
+    client = TestClient(app.app)
+
+    def request(path, encoding):
+        started = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        seconds = time.perf_counter() - started
+        # As sent: compressed bodies are decoded by the client
+        size = int(response.headers.get("content-length", len(response.content)))
+        return response.status_code, seconds, size
+
+    results = {}
+    for name, path, encoding in API_CASES:
+        status, first, size = request(path, encoding)
+        touch(store, event_log)
+        _, after_write, _ = request(path, encoding)
+        warm = [request(path, encoding)[1] for _ in range(repeat)]
+        results[name] = {
+            "status": status,
+            "payload_bytes": size,
+            "first_seconds": first,
+            "after_write_seconds": after_write,
+            "warm_p50_seconds": percentile(warm, 50),
+            "warm_p95_seconds": percentile(warm, 95),
+        }
+    return results
+
+
+def measure_streamlit():
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    app_test = AppTest.from_file(os.path.join(REPO_DIR, "streamlit_app.py"), default_timeout=STREAMLIT_TIMEOUT_SECONDS)
+    _, cold = timed(app_test.run)
+    _, warm = timed(app_test.run)
+    result = {
+        "cold_seconds": cold,
+        "warm_seconds": warm,
+        "markdown_bytes": sum(len(str(m.value).encode("utf-8")) for m in app_test.markdown),
+    }
+    if app_test.exception:
+        result["error"] = str(app_test.exception[0].value)
+    return result
+
+
+def measure_worker(store, repeat, seed):
+    import ai_worker
+    from dup_index import get_dup_index
+    from scheduler import get_idea_queues
+
+    # Mock generators only: the benchmark is about the store side of a cycle
+    ai_worker.USE_AI = False
+    ai_worker.THINK_SECONDS = 0
+    random.seed(seed)
+
+    _, queues_seconds = timed(get_idea_queues)
+    dup_index, dup_seconds = timed(get_dup_index)
+
+    def cycle():
+        persona = random.choice(ai_worker.PERSONAS)
+        ai_worker.commit_new_idea(ai_worker.generate_idea_mock(persona), persona["role"])
+        batch = ai_worker.oldest_ideas(ai_worker.AI_REVIEW_BATCH, set())
+        if batch:
+            asyncio.run(ai_worker.review_ideas(batch))
+
+    before = store.count()
+    _, first = timed(cycle)
+    after_first = store.count()
+    warm = [timed(cycle)[1] for _ in range(repeat)]
+    _, sweep_seconds = timed(ai_worker.sweep_near_duplicates)
+    return {
+        "queues_build_seconds": queues_seconds,
+        "dup_index_build_seconds": dup_seconds,
+        "cycle_first_seconds": first,
+        "cycle_warm_p50_seconds": percentile(warm, 50),
+        "cycle_warm_p95_seconds": percentile(warm, 95),
+        # The first cycle's tidy drops the corpus's drafts, low scores and duplicate titles
+        "ideas_dropped_by_first_cycle": before + 1 - after_first,
+        "dedup_sweep_seconds": sweep_seconds,
+        "ideas_dropped_by_sweep": dup_index.swept,
+    }
+
+
+def run_size(size, workdir, seed, repeat):
+    # Imported only now: the stores read IDEAS_DB / EVENTS_DIR at import
+    import migrations
+    from corpus import generate_events, generate_ideas, write_json_array
+    from event_log import get_event_log
+    from idea_store import get_store
+
+    result = {"size": size}
+    corpus_path = os.path.join(workdir, "corpus.json")
+    _, generate_seconds = timed(write_json_array, corpus_path, generate_ideas(size, seed))
+    # Picked up by get_event_log() from the working directory, like a legacy events.json
+    write_json_array(os.path.join(workdir, "events.json"), reversed(list(generate_events(size, seed))))
+
+    store = get_store()
+    _, load_seconds = timed(load_corpus, corpus_path, store)
+    event_log, events_seconds = timed(get_event_log)
+    result["corpus"] = {
+        "generate_seconds": generate_seconds,
+        "file_bytes": os.path.getsize(corpus_path),
+        "store_load_seconds": load_seconds,
+        "events_import_seconds": events_seconds,
+        # The WAL holds whatever has not been checkpointed yet
+        "db_bytes": sum(os.path.getsize(store.path + suffix) for suffix in ("", "-wal")
+                        if os.path.exists(store.path + suffix)),
+    }
+
+    file_result, file_seconds = timed(migrations.migrate_file, corpus_path)
+    # get_store() migrated the store while it was still empty: time a full run over the corpus
+    store.set_meta(migrations.SCHEMA_VERSION_KEY, 0)
+    store_result, store_seconds = timed(migrations.migrate_store, store)
+    result["migrations"] = {
+        "file_seconds": file_seconds,
+        "file_changed": file_result["changed"],
+        "store_seconds": store_seconds,
+        "store_changed": store_result["changed"],
+    }
+
+    print(f"[{size}] API...", flush=True)
+    result["api"] = measure_api(store, event_log, repeat)
+    print(f"[{size}] Streamlit...", flush=True)
+    result["streamlit"] = measure_streamlit()
+    # Last: the worker's tidy and sweep shrink the corpus
+    print(f"[{size}] worker...", flush=True)
+    result["worker"] = measure_worker(store, repeat, seed)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+# --- Driver ---
+
+def git_commit():
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return head + ("-dirty" if dirty else "")
+
+
+def run_child(size, args):
+    workdir = tempfile.mkdtemp(prefix=f"scaling-bench-{size}-")
+    # Both front ends read static/ relative to the working directory
+    os.symlink(os.path.join(REPO_DIR, "static"), os.path.join(workdir, "static"))
+    env = dict(os.environ)
+    env.pop("GEMINI_API_KEY", None)
+    env.update({
+        "IDEAS_DB": os.path.join(workdir, "ideas.db"),
+        "EVENTS_DIR": os.path.join(workdir, "events.d"),
+        "LLM_CACHE_DB": os.path.join(workdir, "llm_cache.db"),
+        "EMBEDDED_WORKER": "0",
+        "AI_PACE_SECONDS": "0",
+        "AI_RPM": "0",
+        "AI_TPM": "0",
+    })
+    result_path = os.path.join(workdir, "result.json")
+    log_path = os.path.join(workdir, "output.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-size", str(size), "--workdir", workdir,
+             "--seed", str(args.seed), "--repeat", str(args.repeat)],
+            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+    if proc.returncode != 0:
+        with open(log_path, "r", encoding="utf-8") as f:
+            tail = f.read()[-2000:]
+        print(tail)
+        result = {"size": size, "error": f"exit status {proc.returncode}, see {log_path}"}
+        args.keep = True
+    else:
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    if args.keep:
+        print(f"scratch directory: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def print_summary(result):
+    if "error" in result:
+        print(f"  failed: {result['error']}")
+        return
+    corpus = result["corpus"]
+    print(f"  corpus {corpus['file_bytes'] / 1e6:.1f} MB, generated in {corpus['generate_seconds']:.2f}s, "
+          f"loaded in {corpus['store_load_seconds']:.2f}s")
+    migrations = result["migrations"]
+    print(f"  migrations: file {migrations['file_seconds']:.2f}s, store {migrations['store_seconds']:.2f}s")
+    api = result["api"]
+    if "skipped" in api:
+        print(f"  api: skipped ({api['skipped']})")
+    for name, case in api.items():
+        if isinstance(case, dict):
+            print(f"  {name:<22} first {case['first_seconds'] * 1000:9.1f}ms  "
+                  f"after write {case['after_write_seconds'] * 1000:9.1f}ms  "
+                  f"p50 {case['warm_p50_seconds'] * 1000:8.2f}ms  {case['payload_bytes']:>12,} bytes")
+    streamlit = result["streamlit"]
+    if "skipped" in streamlit:
+        print(f"  streamlit: skipped ({streamlit['skipped']})")
+    else:
+        print(f"  streamlit: cold {streamlit['cold_seconds']:.2f}s, warm {streamlit['warm_seconds']:.2f}s")
+    worker = result["worker"]
+    print(f"  worker: indexes {worker['queues_build_seconds'] + worker['dup_index_build_seconds']:.2f}s, "
+          f"first cycle {worker['cycle_first_seconds']:.2f}s, cycle p50 {worker['cycle_warm_p50_seconds'] * 1000:.1f}ms, "
+          f"sweep {worker['dedup_sweep_seconds']:.2f}s")
+    print(f"  peak RSS {result['peak_rss_mb']} MB")
+
+
+def flatten(node, prefix=""):
+    """{"a.b.c": number} for every numeric leaf."""
+    flat = {}
+    for key, value in node.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(before_path, after_path, tolerance):
+    """Prints every timing / size metric of both runs; returns the number of regressions."""
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"{before['commit']} -> {after['commit']} (regression: more than {tolerance:.0%} worse)")
+    old, new = flatten(before["sizes"]), flatten(after["sizes"])
+    regressions = 0
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (int(k.split(".")[0]), k)):
+        if not key.endswith(("_seconds", "_bytes", "_mb")):
+            continue
+        ratio = new[key] / old[key] if old[key] else float("inf") if new[key] else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<60} {old[key]:>14.6g} {new[key]:>14.6g} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark over synthetic corpora.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated corpus sizes")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--repeat", type=int, default=20, help="warm requests / worker cycles per measurement")
+    parser.add_argument("--output", help="results file (default: benchmark-<commit>.json)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directories")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two results files")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown reported as a regression by --compare")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance) else 0)
+
+    if args.run_size is not None:
+        result = run_size(args.run_size, args.workdir, args.seed, args.repeat)
+        with open(os.path.join(args.workdir, "result.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"--- {size:,} ideas ---", flush=True)
+        result = run_child(size, args)
+        results["sizes"][str(size)] = result
+        print_summary(result)
+
+    output = args.output or f"benchmark-{commit[:12]}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"results: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+End-to-end throughput benchmark of the AI worker: runs run_ai_simulation
+against the local Gemini stand-in (gemini_standin.py) in a scratch store,
+with pacing and rate limits off, and reports
+
+- ideas/min and reviews/min committed to the store,
+- p50/p99 latency of generate and review actions (LLM round trip included),
+- fallbacks to the mock generators (errors, 429s, malformed JSON),
+- store write amplification: revisions per committed action and bytes
+  written by the process per byte of idea JSON saved.
+
+    python benchmark_worker.py --duration 60 --concurrency 8 --latency-median 1.5 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from gemini_standin import add_config_arguments, config_from_args, start_standin
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def bytes_written():
+    # wchar: bytes this process passed to write(), whatever the filesystem
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def instrument(ai_worker, stats):
+    """Wraps the worker's LLM actions and store writes with counters."""
+
+    def timed(fn, name):
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                stats["latency"][name].append(time.perf_counter() - started)
+        return wrapper
+
+    def counted(fn, name):
+        def wrapper(*args, **kwargs):
+            stats[name] += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    save_idea = ai_worker.save_idea
+
+    def save_and_measure(idea):
+        stats["idea_bytes"] += len(json.dumps(idea, ensure_ascii=False).encode("utf-8"))
+        return save_idea(idea)
+
+    commit_new_idea = ai_worker.commit_new_idea
+
+    def count_idea(*args):
+        committed = commit_new_idea(*args)
+        stats["ideas"] += bool(committed)
+        return committed
+
+    commit_review = ai_worker.commit_review
+
+    def count_review(idea, reviewer_role):
+        committed = commit_review(idea, reviewer_role)
+        stats["reviews"] += bool(committed)
+        return committed
+
+    ai_worker.generate_idea_ai = timed(ai_worker.generate_idea_ai, "generate")
+    ai_worker.update_idea_ai = timed(ai_worker.update_idea_ai, "review")
+    ai_worker.update_ideas_ai = timed(ai_worker.update_ideas_ai, "review")
+    ai_worker.generate_idea_mock = counted(ai_worker.generate_idea_mock, "generate_fallbacks")
+    ai_worker.update_idea_mock = counted(ai_worker.update_idea_mock, "review_fallbacks")
+    ai_worker.commit_new_idea = count_idea
+    ai_worker.commit_review = count_review
+    ai_worker.save_idea = save_and_measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker throughput benchmark against the local Gemini stand-in.")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run the worker")
+    parser.add_argument("--concurrency", type=int, default=8, help="AI_CONCURRENCY")
+    parser.add_argument("--reviewers", type=int, default=4, help="AI_REVIEWERS")
+    parser.add_argument("--review-batch", type=int, default=3, help="AI_REVIEW_BATCH")
+    parser.add_argument("--seed-store", action="store_true", help="start from ideas.json instead of an empty store")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_standin(config_from_args(args))
+    workdir = tempfile.mkdtemp(prefix="worker-bench-")
+    os.environ.update({
+        "GEMINI_API_KEY": "standin",
+        "GEMINI_BASE_URL": base_url,
+        "IDEAS_DB": os.path.join(workdir, "ideas.db"),
+        "EVENTS_DIR": os.path.join(workdir, "events.d"),
+        "LLM_CACHE_DB": os.path.join(workdir, "llm_cache.db"),
+        "AI_CONCURRENCY": str(args.concurrency),
+        "AI_REVIEWERS": str(args.reviewers),
+        "AI_REVIEW_BATCH": str(args.review_batch),
+        "AI_PACE_SECONDS": "0",
+        "AI_RPM": "0",
+        "AI_TPM": "0",
+    })
+    # Imported only now: the worker and the stores read the settings above at import
+    import ai_worker
+    from idea_store import IdeaStore, get_store
+
+    if not ai_worker.USE_AI:
+        sys.exit("google-genai is not installed; the benchmark needs the real client to talk to the stand-in.")
+    ai_worker.THINK_SECONDS = 0
+    if not args.seed_store:
+        # Importing an empty corpus marks the store as seeded, so get_store()
+        # leaves it empty instead of loading ideas.json
+        empty = os.path.join(workdir, "empty.json")
+        with open(empty, "w", encoding="utf-8") as f:
+            f.write("[]")
+        IdeaStore().import_json(empty)
+
+    stats = {"latency": {"generate": [], "review": []}, "ideas": 0, "reviews": 0,
+             "generate_fallbacks": 0, "review_fallbacks": 0, "idea_bytes": 0}
+    instrument(ai_worker, stats)
+
+    start_revision = get_store().revision()
+    start_bytes = bytes_written()
+    started = time.monotonic()
+    asyncio.run(ai_worker.run_for(args.duration))
+    elapsed_min = (time.monotonic() - started) / 60
+    written = bytes_written()
+    revisions = get_store().revision() - start_revision
+    server.shutdown()
+
+    actions = stats["ideas"] + stats["reviews"]
+    print(f"\n--- {args.duration:.0f}s, concurrency {args.concurrency}, {args.reviewers} reviewers x{args.review_batch}, "
+          f"stand-in median {args.latency_median}s ---")
+    print(f"ideas/min:    {stats['ideas'] / elapsed_min:8.1f}  ({stats['ideas']} committed, "
+          f"{stats['generate_fallbacks']} mock fallbacks)")
+    print(f"reviews/min:  {stats['reviews'] / elapsed_min:8.1f}  ({stats['reviews']} committed, "
+          f"{stats['review_fallbacks']} mock fallbacks)")
+    for name, values in stats["latency"].items():
+        print(f"{name + ' latency:':<18}p50 {percentile(values, 50):6.2f}s  p99 {percentile(values, 99):6.2f}s  (n={len(values)})")
+    if actions:
+        print(f"revisions per committed action: {revisions / actions:.2f}")
+    if written is not None and start_bytes is not None and stats["idea_bytes"]:
+        print(f"bytes written per idea byte saved: {(written - start_bytes) / stats['idea_bytes']:.2f} "
+              f"(store, event log and LLM cache)")
+    llm = ai_worker.llm_stats()
+    calls = llm["calls"]
+    print(f"LLM calls: {calls['calls']}, {calls['retries']} retries, {calls['timeouts']} timeouts, "
+          f"{calls['hedges']} hedges ({calls['hedge_wins']} won), breaker opened {calls['breaker_opens']}x, "
+          f"{calls['short_circuited']} short-circuited")
+    print(f"LLM cache: {llm['cache']['hits']} hits, {llm['cache']['misses']} misses")
+
+    if args.keep:
+        print(f"scratch directory: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
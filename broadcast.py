@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import deque
+
+# Messages kept for Last-Event-ID resume
+SSE_HISTORY = int(os.getenv("SSE_HISTORY", "256"))
+# Per-client backlog; a client that falls this far behind is disconnected and
+# resumes from the history when its EventSource reconnects
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+SSE_HEARTBEAT_SECONDS = 15
+# How often each web process checks the store and the event log for writes
+# to relay (the worker may run in another process)
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "0.5"))
+# Newest events looked at per poll; a burst larger than this is cut short
+RELAY_EVENT_WINDOW = 50
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Broadcaster:
+    """
+    In-process fan-out of worker notifications to SSE clients (fed by a
+    StoreRelay).
+
+    publish() can be called from any thread; every subscriber gets the
+    message through its own bounded asyncio.Queue on its own loop. Message ids
+    are "<boot>-<seq>", so a Last-Event-ID from before a restart (or older than
+    the history) is recognised and answered with a "reset" message instead of
+    silently missing updates.
+    """
+
+    def __init__(self, history=SSE_HISTORY):
+        self.boot = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._seq += 1
+            message = (f"{self.boot}-{self._seq}", event_type, json.dumps(data, ensure_ascii=False))
+            self._history.append((self._seq, message))
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                if _running_loop() is sub.loop:
+                    self._offer(sub, message)
+                else:
+                    sub.loop.call_soon_threadsafe(self._offer, sub, message)
+            except RuntimeError:
+                # Subscriber's loop is closed
+                self._drop(sub)
+
+    def _offer(self, sub, message):
+        try:
+            sub.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            sub.overflowed = True
+            self._drop(sub)
+
+    def _drop(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def _replay_locked(self, last_event_id):
+        """Messages after last_event_id, or None if they can no longer be replayed."""
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq > self._seq:
+            return None
+        if self._history and self._history[0][0] > seq + 1:
+            return None
+        return [m for s, m in self._history if s > seq]
+
+    async def subscribe(self, last_event_id=None):
+        """
+        Async generator of (id, event, data) messages. Yields None every
+        SSE_HEARTBEAT_SECONDS of silence so the caller can send a keep-alive.
+        """
+        sub = _Subscriber(asyncio.get_running_loop())
+        # Registering and taking the backlog under one lock means no message
+        # is both replayed and queued, and none falls in between
+        with self._lock:
+            self._subscribers.add(sub)
+            backlog = []
+            if last_event_id:
+                backlog = self._replay_locked(last_event_id)
+                if backlog is None:
+                    backlog = [(f"{self.boot}-{self._seq}", "reset", "{}")]
+        try:
+            for message in backlog:
+                yield message
+            while not sub.overflowed:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._drop(sub)
+
+
+class StoreRelay:
+    """
+    Feeds a Broadcaster from what the worker wrote to the store and the event
+    log, whichever process it runs in: poll() publishes idea-changed /
+    idea-removed for the store's changes feed since the last poll, new-event
+    for events appended since, and reset if the feed can no longer tell.
+    An idle poll costs one revision read and one stat().
+    """
+
+    def __init__(self, broadcaster, store, event_log):
+        self.broadcaster = broadcaster
+        self.store = store
+        self.event_log = event_log
+        self.revision = store.revision()
+        self.events_version = event_log.version()
+        latest = event_log.latest(1)
+        self.last_timestamp = latest[0]["timestamp"] if latest else ""
+
+    def poll(self):
+        if self.store.revision() != self.revision:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self.broadcaster.publish("reset", {"revision": delta["revision"]})
+            else:
+                for idea_id in delta["removed"]:
+                    self.broadcaster.publish("idea-removed", {"revision": delta["revision"], "id": idea_id})
+                for idea in delta["changed"]:
+                    self.broadcaster.publish("idea-changed", {"revision": delta["revision"], "idea": idea})
+            self.revision = delta["revision"]
+
+        version = self.event_log.version()
+        if version != self.events_version:
+            self.events_version = version
+            fresh = [e for e in self.event_log.latest(RELAY_EVENT_WINDOW) if e["timestamp"] > self.last_timestamp]
+            for event in reversed(fresh):
+                self.broadcaster.publish("new-event", event)
+            if fresh:
+                self.last_timestamp = fresh[0]["timestamp"]
+
+    async def run(self, interval=SSE_POLL_SECONDS):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.poll)
+            except Exception as e:
+                print(f"Store relay failed: {e}")
+            await asyncio.sleep(interval)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def format_sse(message):
+    if message is None:
+        return ": ping\n\n"
+    event_id, event_type, data = message
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    """Process-wide Broadcaster."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = Broadcaster()
+    return _broadcaster
@@ -0,0 +1,197 @@
+"""
+Deterministic synthetic corpora of ideas (and events) at any size, for
+benchmarks: the same seed and size always give the same records.
+
+Ideas are built from the MOCK_DATABASE templates the way the mock worker
+builds them (ai_worker.idea_from_template), then varied so that the corpus
+looks like a long-running LLM worker's output rather than ten templates
+repeated:
+
+- titles are unique, as tidy_ideas() would leave them
+- the approach pairs one template's problem with another's solution and
+  adds a paragraph of randomised detail, so that only a small share of
+  ideas are near-duplicates of each other
+- half of the schedules keep the templates' legacy per-month phase lists,
+  the other half come from migrations.varied_schedule()
+- scores, timestamps (spread over the year before CORPUS_EPOCH), drafts and
+  review comments are drawn from the seed
+
+    python corpus.py --size 10000 --seed 0 --output corpus.json [--events 1000 --events-output events.json]
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from ai_worker import MOCK_DATABASE, PERSONAS, idea_from_template
+from migrations import varied_schedule
+
+# Newest timestamp in a corpus; fixed so that corpora do not depend on the day
+CORPUS_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+CORPUS_SPAN_SECONDS = 365 * 24 * 3600
+# Shares of legacy schedules, drafts and reviewed ideas
+LEGACY_SCHEDULE_SHARE = 0.5
+DRAFT_SHARE = 0.01
+REVIEWED_SHARE = 0.6
+# Randomised detail sentences per approach: enough that ideas from the same
+# pair of templates rarely come out as near-duplicates
+DETAIL_CLAUSE_COUNT = 6
+
+INDUSTRIES = ["製造業", "小売業", "金融業", "保険業", "物流業", "製薬業", "建設業", "IT・通信業", "食品業",
+              "商社", "自動車部品業", "化学業", "電力・ガス業", "外食業", "医療法人", "教育機関"]
+REGIONS = ["国内", "アジア太平洋", "北米", "欧州", "国内・海外子会社"]
+DEPARTMENTS = ["人事部", "情報システム部", "経営企画部", "人材開発部", "給与・労務部", "採用チーム", "事業部門"]
+KPIS = ["離職率", "採用リードタイム", "月次締め工数", "評価面談の実施率", "研修受講率", "問い合わせ件数",
+        "データ不整合件数", "ライセンス費用", "内定辞退率", "残業時間"]
+MODULES = ["Employee Central", "Recruiting", "Onboarding", "Performance & Goals", "Learning", "Compensation",
+           "Succession & Development", "Platform (Foundation)", "Workforce Analytics"]
+TOOLS = ["BTP (Integration Suite)", "SAP Analytics Cloud", "Microsoft Teams", "Slack", "ServiceNow", "Okta",
+         "Azure AD", "Power BI", "Tableau", "Workato"]
+DETAIL_CLAUSES = [
+    "{department}と{months}ヶ月間のパイロットを行い、{kpi}を{pct}%改善することを目標とする",
+    "{module}の標準機能で{share}%の要件を満たし、残りは{tool}との連携で補う",
+    "従業員{employees}名規模の{region}拠点から段階的に展開する",
+    "初年度の運用工数を{hours}時間削減し、{department}の定型作業を自動化する",
+    "{tool}上に承認フローを構築し、{module}の更新を{minutes}分以内に反映する",
+    "既存の{kpi}レポートを{module}のデータで置き換え、週次で{department}に配信する",
+    "{region}の{sites}拠点で利用状況をモニタリングし、{weeks}週ごとに改善サイクルを回す",
+    "{department}向けに{sessions}回のハンズオン研修を実施し、定着率{share}%を目指す",
+    "マスターデータ{records}件の移行を{tool}で自動検証し、不整合を事前に洗い出す",
+    "{kpi}の目標値を{pct}%に設定し、{months}ヶ月後に経営会議で効果を報告する",
+    "{module}と{tool}のAPI連携を{weeks}週間で検証し、本番環境への適用可否を判断する",
+    "{employees}名分の履歴データを用いて{kpi}の要因分析を行い、施策の優先順位を決める",
+    "{region}の労働法制に合わせて{module}の設定を{sites}パターン用意し、{department}が保守できる形で文書化する",
+    "{tool}のダッシュボードで{kpi}を日次に可視化し、閾値を超えた部署には自動で通知する",
+    "稼働後{months}ヶ月はベンダーが{department}に常駐し、問い合わせ{records}件分のFAQを整備する",
+    "{module}の権限ロールを{sessions}種類に整理し、監査対応の工数を{pct}%削減する",
+    "費用対効果は{hours}時間分の工数削減と{kpi}の改善で試算し、投資回収期間を{months}ヶ月と見込む",
+    "{employees}名の従業員アンケートで{kpi}への影響を測り、{weeks}週間ごとに設定を見直す",
+    "{tool}経由で{records}件の勤怠・給与データを連携し、手作業の転記を廃止する",
+    "{region}の子会社{sites}社を第二フェーズの対象とし、テンプレート化した設定で{weeks}週間以内に展開する",
+    "部門長{sessions}名へのヒアリング結果をもとに、{module}の画面項目を{share}%まで削減する",
+    "{department}が{tool}上で申請状況を追跡できるようにし、差し戻し率を{pct}%下げる",
+    "障害時は{minutes}分以内に{tool}へ自動起票し、{department}の一次対応を標準化する",
+    "{kpi}と{module}の利用ログを突き合わせ、効果の出ていない拠点を{weeks}週ごとに特定する",
+]
+REVIEW_COMMENTS = [
+    "{role}からの指摘: {kpi}の測定方法を事前に合意しておく必要がある。",
+    "{role}からの指摘: {tool}のライセンス費用を見積もりに含めるべき。",
+    "{role}からの指摘: {department}の負荷を考慮し、展開を{weeks}週間後ろ倒しにする案も用意する。",
+    "追加検討: {module}の四半期リリースによる影響を確認しておく。",
+]
+EVENT_MESSAGES = [
+    "【{role}】が新規アイディアを考案中です...",
+    "【{role}】が新しいアイディア「{title}」を提出しました！",
+    "【{role}】が【{author}】のアイディア「{title}」をレビューしています...",
+    "【{role}】がレビューを反映し、プランがアップデートされました！",
+    "【System】優先度の低いアイディア「{title}」を破棄し、整理しました。",
+]
+
+
+def _slots(rng):
+    return {
+        "department": rng.choice(DEPARTMENTS),
+        "kpi": rng.choice(KPIS),
+        "module": rng.choice(MODULES),
+        "tool": rng.choice(TOOLS),
+        "region": rng.choice(REGIONS),
+        "months": rng.randint(1, 12),
+        "weeks": rng.randint(1, 26),
+        "pct": rng.randint(5, 60),
+        "share": rng.randint(40, 95),
+        "employees": rng.randrange(300, 80000, 50),
+        "hours": rng.randrange(100, 20000, 10),
+        "minutes": rng.randint(1, 120),
+        "sites": rng.randint(2, 140),
+        "sessions": rng.randint(2, 40),
+        "records": rng.randrange(1000, 2000000, 100),
+    }
+
+
+def _sections(approach):
+    """The 【課題】 and 【解決案】 paragraphs of a template approach."""
+    problem, _, solution = approach.partition("\n\n")
+    return problem, solution
+
+
+def _timestamp(rng):
+    return (CORPUS_EPOCH - timedelta(seconds=rng.randrange(CORPUS_SPAN_SECONDS))).isoformat()
+
+
+def synthetic_idea(rng, n):
+    """The n-th idea of a corpus (rng carries the corpus state)."""
+    persona = rng.choice(PERSONAS)
+    templates = [t for t in MOCK_DATABASE if t["role"] == persona["role"]] or MOCK_DATABASE
+    base = rng.choice(templates)
+    created_at = _timestamp(rng)
+    idea = idea_from_template(base, str(uuid.UUID(int=rng.getrandbits(128), version=4)), created_at, rng)
+
+    slots = _slots(rng)
+    industry = rng.choice(INDUSTRIES)
+    problem, _ = _sections(base["approach"])
+    _, solution = _sections(rng.choice(MOCK_DATABASE)["approach"])
+    details = "。".join(clause.format(**slots) for clause in rng.sample(DETAIL_CLAUSES, DETAIL_CLAUSE_COUNT))
+    idea["title"] = f"{base['title']}（{industry}・案{n + 1}）"
+    idea["approach"] = f"{problem}\n\n{solution}\n\n【施策詳細】{industry}向け。{details}。"
+    idea["target_audience"] = base.get("target_audience", "")
+    idea["recommendation_score"] = rng.choice([1, 2, 3, 3, 4, 4, 4, 5, 5, 5])
+    if rng.random() >= LEGACY_SCHEDULE_SHARE:
+        idea["schedule"] = varied_schedule(rng)
+    if rng.random() < REVIEWED_SHARE:
+        reviewer = rng.choice(PERSONAS)["role"]
+        idea["review_comment"] = rng.choice(REVIEW_COMMENTS).format(role=reviewer, **slots)
+        idea["updated_at"] = max(created_at, _timestamp(rng))
+    if rng.random() < DRAFT_SHARE:
+        idea["draft"] = True
+    return idea
+
+
+def generate_ideas(size, seed=0):
+    """Generator of `size` ideas; deterministic for a given seed."""
+    rng = random.Random(f"ideas:{seed}")
+    for n in range(size):
+        yield synthetic_idea(rng, n)
+
+
+def generate_events(size, seed=0):
+    """Generator of `size` worker events, oldest first, in the event log's format."""
+    rng = random.Random(f"events:{seed}")
+    timestamps = sorted(_timestamp(rng) for _ in range(size))
+    for timestamp in timestamps:
+        message = rng.choice(EVENT_MESSAGES).format(
+            role=rng.choice(PERSONAS)["role"],
+            author=rng.choice(PERSONAS)["role"],
+            title=rng.choice(MOCK_DATABASE)["title"],
+        )
+        yield {"timestamp": timestamp, "message": message}
+
+
+def write_json_array(path, items):
+    """Writes the items as a JSON array, one per line, without holding them all; returns the count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(("," if count else "") + "\n" + json.dumps(item, ensure_ascii=False))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes a deterministic synthetic corpus of ideas.")
+    parser.add_argument("--size", type=int, required=True, help="number of ideas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="corpus.json", help="JSON array file (the legacy ideas.json format)")
+    parser.add_argument("--events", type=int, default=0, help="also write this many events")
+    parser.add_argument("--events-output", default="corpus_events.json",
+                        help="events file (the legacy newest-first events.json format)")
+    args = parser.parse_args()
+
+    count = write_json_array(args.output, generate_ideas(args.size, args.seed))
+    print(f"Wrote {count} ideas to {args.output}.")
+    if args.events:
+        events = list(generate_events(args.events, args.seed))
+        count = write_json_array(args.events_output, reversed(events))
+        print(f"Wrote {count} events to {args.events_output}.")
@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import defaultdict
+
+from idea_store import get_store
+from minhash import idea_signature, lsh_params, similarity, unpack
+
+# Estimated Jaccard similarity (title + approach shingles) at which two ideas
+# count as near-duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+
+
+class DuplicateIndex:
+    """
+    LSH index over the MinHash signatures the store keeps per idea. Each
+    signature is cut into bands and every band is hashed into a bucket, so
+    the candidates for an idea are the ideas sharing at least one bucket
+    (sub-linear in the corpus), and only those are compared. Like IdeaIndex
+    it follows the store's changes feed; drafts are not indexed.
+    """
+
+    def __init__(self, store, threshold=DEDUP_THRESHOLD):
+        self.store = store
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold)
+        self.suppressed = 0  # rejected at insert
+        self.swept = 0  # removed by sweep()
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.revision = self.store.revision()
+        self._buckets = [defaultdict(set) for _ in range(self.bands)]
+        self._signatures = {}
+        drafts = {i["id"] for i in self.store.all() if i.get("draft")}
+        for idea_id, blob in self.store.signatures().items():
+            if idea_id not in drafts:
+                self._add(idea_id, unpack(blob))
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [hash(tuple(sig[b * r:(b + 1) * r])) for b in range(self.bands)]
+
+    def _add(self, idea_id, sig):
+        self._signatures[idea_id] = sig
+        for band, key in enumerate(self._band_keys(sig)):
+            self._buckets[band][key].add(idea_id)
+
+    def _remove(self, idea_id):
+        sig = self._signatures.pop(idea_id, None)
+        if sig is None:
+            return
+        for band, key in enumerate(self._band_keys(sig)):
+            bucket = self._buckets[band][key]
+            bucket.discard(idea_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def refresh(self):
+        """Applies store changes since the last refresh."""
+        if self.store.revision() == self.revision:
+            return
+        with self._lock:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self._rebuild()
+                return
+            for idea_id in delta["removed"]:
+                self._remove(idea_id)
+            finished = [i["id"] for i in delta["changed"] if not i.get("draft")]
+            for idea in delta["changed"]:
+                self._remove(idea["id"])
+            for idea_id, blob in self.store.signatures(finished).items():
+                self._add(idea_id, unpack(blob))
+            self.revision = delta["revision"]
+
+    def _matches(self, idea_id, sig):
+        candidates = set()
+        for band, key in enumerate(self._band_keys(sig)):
+            candidates |= self._buckets[band].get(key, set())
+        candidates.discard(idea_id)
+        matches = [(other, similarity(sig, self._signatures[other])) for other in candidates]
+        return sorted((m for m in matches if m[1] >= self.threshold), key=lambda m: m[1], reverse=True)
+
+    def find(self, idea):
+        """[(id, similarity)] of stored ideas near-duplicating `idea`, most similar first."""
+        self.refresh()
+        with self._lock:
+            return self._matches(idea["id"], idea_signature(idea))
+
+    def sweep(self):
+        """
+        Groups of near-duplicate ids among the stored ideas (each group has
+        two or more ids; groups are connected components of the
+        above-threshold pairs).
+        """
+        self.refresh()
+        with self._lock:
+            parent = {}
+
+            def root(x):
+                while parent.get(x, x) != x:
+                    x = parent[x]
+                return x
+
+            linked = set()
+            for idea_id, sig in self._signatures.items():
+                for other, _ in self._matches(idea_id, sig):
+                    linked.update((idea_id, other))
+                    a, b = root(idea_id), root(other)
+                    if a != b:
+                        parent[a] = b
+            groups = defaultdict(list)
+            for idea_id in linked:
+                groups[root(idea_id)].append(idea_id)
+            return list(groups.values())
+
+    def stats(self):
+        return {
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+            "indexed": len(self._signatures),
+            "suppressed": self.suppressed,
+            "swept": self.swept,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dup_index():
+    """Process-wide DuplicateIndex over get_store()."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DuplicateIndex(get_store())
+    return _index
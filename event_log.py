@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking (Windows): run a single writer process there
+    fcntl = None
+
+EVENTS_DIR = os.getenv("EVENTS_DIR", "events.d")
+LEGACY_EVENTS_FILE = "events.json"
+# Events kept on disk; older segments are dropped by the background compactor
+EVENT_RETENTION = int(os.getenv("EVENT_RETENTION", "1000"))
+# A segment is sealed and a new one started once it grows past this size
+EVENT_SEGMENT_BYTES = int(os.getenv("EVENT_SEGMENT_BYTES", str(64 * 1024)))
+
+INDEX_FILE = "index.json"
+# flock()ed by writers of every process sharing the directory
+LOCK_FILE = "write.lock"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".ndjson"
+
+
+class EventLog:
+    """
+    Append-only NDJSON event log split into size-bounded segments.
+
+    Appends are a single write to the open tail segment. The small index file
+    records the event count of every sealed segment so that compaction never
+    has to re-read them, and reading the latest N events scans the tail segment
+    backwards (falling back to the previous segment only right after a
+    rotation).
+
+    Several processes may hold an EventLog on the same directory (every web
+    process does, and any of them can become the worker leader). Writes
+    therefore hold an exclusive flock on LOCK_FILE and first re-read the
+    segment list and the index, so a writer never appends to a segment
+    another process has sealed or compacted away, nor writes back a stale
+    index.
+    """
+
+    def __init__(self, directory=EVENTS_DIR, retention=EVENT_RETENTION, segment_bytes=EVENT_SEGMENT_BYTES):
+        self.directory = directory
+        self.retention = retention
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._compact_requested = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = os.open(self._path(LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+
+        self._sealed = {}
+        self._active = None
+        self._file = None
+        self._size = -1
+        self._active_count = 0
+        with self._writing():
+            pass
+
+        self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+        self._compactor.start()
+
+    # --- Paths & index ---
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _segment_name(n):
+        return f"{SEGMENT_PREFIX}{n:08d}{SEGMENT_SUFFIX}"
+
+    def _segment_names(self):
+        names = [n for n in os.listdir(self.directory) if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX)]
+        return sorted(names)
+
+    def _load_index(self):
+        try:
+            with open(self._path(INDEX_FILE), "r", encoding="utf-8") as f:
+                return json.load(f).get("segments", {})
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _writing(self):
+        """Serializes writers across threads and processes and syncs our view of the directory first."""
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _sync(self):
+        # Another process may have appended, rotated or compacted since our last write
+        segments = self._segment_names()
+        if not segments:
+            segments = [self._segment_name(1)]
+        sealed = self._load_index()
+        # Sealed segments missing from the index (e.g. a crash mid-rotation)
+        for name in segments[:-1]:
+            if name not in sealed:
+                sealed[name] = _count_lines(self._path(name))
+        self._sealed = {k: v for k, v in sealed.items() if k in segments[:-1]}
+
+        tail_path = self._path(segments[-1])
+        if self._file is None or segments[-1] != self._active or not _is_open_file(self._file, tail_path):
+            if self._file is not None:
+                self._file.close()
+            self._active = segments[-1]
+            self._file = open(tail_path, "ab")
+            self._size = -1
+        size = os.fstat(self._file.fileno()).st_size
+        if size != self._size:
+            # Written to by someone else (or newly opened): recount, at most one segment
+            self._active_count = _count_lines(tail_path)
+            self._size = size
+
+    def _write_index(self):
+        tmp = self._path(INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segments": self._sealed}, f)
+        os.replace(tmp, self._path(INDEX_FILE))
+
+    # --- Writes ---
+    def append(self, message):
+        event = {"timestamp": datetime.now(timezone.utc).isoformat(), "message": message}
+        line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._writing():
+            self._file.write(line)
+            self._file.flush()
+            self._size += len(line)
+            self._active_count += 1
+            if self._size >= self.segment_bytes:
+                self._rotate()
+        return event
+
+    def _rotate(self):
+        self._file.close()
+        self._sealed[self._active] = self._active_count
+        self._write_index()
+        next_n = int(self._active[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+        self._active = self._segment_name(next_n)
+        self._file = open(self._path(self._active), "ab")
+        self._size = 0
+        self._active_count = 0
+        self._compact_requested.set()
+
+    # --- Compaction ---
+    def _compact_loop(self):
+        while True:
+            self._compact_requested.wait()
+            self._compact_requested.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Event log compaction failed: {e}")
+
+    def compact(self):
+        """Drops the oldest sealed segments that fall entirely outside the retention window."""
+        with self._writing():
+            total = self._active_count + sum(self._sealed.values())
+            dropped = []
+            for name in sorted(self._sealed):
+                if total - self._sealed[name] < self.retention:
+                    break
+                total -= self._sealed.pop(name)
+                dropped.append(name)
+            if dropped:
+                self._write_index()
+            for name in dropped:
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+        return len(dropped)
+
+    # --- Reads ---
+    def version(self):
+        """
+        Change token for caches: the tail segment's name, identity, mtime and
+        size. Read from disk so a writer in another process is noticed too.
+        """
+        segments = self._segment_names()
+        if not segments:
+            return None
+        try:
+            st = os.stat(self._path(segments[-1]))
+        except FileNotFoundError:
+            return None
+        return (segments[-1], st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def latest(self, n=50):
+        """Returns up to the n newest events, newest first."""
+        # Listed from disk rather than from our own state, since the writer
+        # may live in another process
+        segments = self._segment_names()
+        events = []
+        for name in reversed(segments):
+            try:
+                lines = _tail_lines(self._path(name), n - len(events))
+            except FileNotFoundError:
+                continue
+            for line in reversed(lines):
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+            if len(events) >= n:
+                break
+        return events[:n]
+
+    def import_json(self, path=LEGACY_EVENTS_FILE):
+        """One-shot import of a legacy newest-first events.json into an empty log."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                events = json.load(f)
+        except ValueError:
+            return 0
+        with self._writing():
+            if self._active_count or self._sealed:
+                return 0
+            for event in reversed(events):
+                line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+                self._file.write(line)
+                self._size += len(line)
+                self._active_count += 1
+            self._file.flush()
+        return len(events)
+
+
+def _is_open_file(f, path):
+    """Whether the open file f is still the file at path (not deleted or replaced)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    fst = os.fstat(f.fileno())
+    return (fst.st_dev, fst.st_ino) == (st.st_dev, st.st_ino)
+
+
+def _count_lines(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def _tail_lines(path, n, block_size=8192):
+    # Reads the file backwards in blocks until n complete lines are available
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.splitlines()
+    if pos > 0:
+        # The first line may have been cut in the middle
+        lines = lines[1:]
+    return [l.decode("utf-8") for l in lines[-n:]] if n > 0 else []
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """Process-wide EventLog, seeded from events.json on first use."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                log = EventLog()
+                log.import_json()
+                _log = log
+    return _log
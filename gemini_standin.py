@@ -0,0 +1,207 @@
+"""
+Local stand-in for the part of the Gemini API that ai_worker.py uses
+(POST /v1beta/models/<model>:generateContent with a JSON response), for
+load tests without a quota:
+
+    python gemini_standin.py --port 8808 --latency-median 1.5 --error-rate 0.05
+    GEMINI_API_KEY=dummy GEMINI_BASE_URL=http://127.0.0.1:8808 python ai_worker.py
+
+Answers are shaped after the prompt: a batched review (one object per
+"[id: ...]" block), a single review, or a new idea.
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ID_RE = re.compile(r"\[id: ([^\]]+)\]")
+_PATH_RE = re.compile(r"^/v1(?:beta|alpha)?/models/([^/:]+):generateContent$")
+
+TARGETS = ["新規開拓", "既存顧客の活用支援"]
+MODULES = ["Employee Central", "Recruiting", "Performance & Goals", "Learning", "Compensation", "Onboarding"]
+
+
+class StandinConfig:
+    """
+    Latency is log-normal around `latency_median` seconds (sigma
+    `latency_sigma`; 0 makes it constant). Of all requests, `error_rate`
+    fail with a 500/503, `rate_limit_rate` with a 429, and `malformed_rate`
+    return 200 with a truncated JSON body.
+    """
+
+    def __init__(self, latency_median=1.0, latency_sigma=0.4, error_rate=0.0, rate_limit_rate=0.0,
+                 malformed_rate=0.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def latency(self):
+        with self.lock:
+            if self.latency_sigma <= 0:
+                return self.latency_median
+            return self.latency_median * math.exp(self.random.gauss(0, self.latency_sigma))
+
+    def outcome(self):
+        """'error', 'rate_limit', 'malformed' or 'ok'."""
+        with self.lock:
+            self.requests += 1
+            r = self.random.random()
+            for outcome, rate in (("error", self.error_rate), ("rate_limit", self.rate_limit_rate),
+                                  ("malformed", self.malformed_rate)):
+                if r < rate:
+                    self.failures += 1
+                    return outcome
+                r -= rate
+            return "ok"
+
+
+def fake_schedule(rng):
+    return [
+        {"phase": "要件定義", "actor": "全体", "name": "現状業務の棚卸し", "duration": f"{rng.randint(1, 4)}週間", "dependency": "なし"},
+        {"phase": "設定", "actor": "ベンダー", "name": "標準設定と検証", "duration": f"{rng.randint(2, 6)}週間", "dependency": "要件定義"},
+        {"phase": "展開", "actor": "顧客", "name": "現場展開と定着化", "duration": f"{rng.randint(2, 8)}週間", "dependency": "設定"},
+    ]
+
+
+def fake_idea(rng, title=None):
+    module = rng.choice(MODULES)
+    return {
+        "title": title or f"{module}活用による業務改善案 #{uuid.uuid4().hex[:6]}",
+        "target": rng.choice(TARGETS),
+        "modules": module,
+        "approach": "【課題】" + "現場の入力負荷と承認の滞留が発生している。" * rng.randint(1, 4) + "【解決案】標準機能の設定見直しで解消する。",
+        "rationale": "標準機能の範囲で効果が出るため、短期間で投資回収が見込める。" * rng.randint(1, 3),
+        "viewpoint": "【見解】小さく始めて早期に効果を示せる案です。",
+        "review_comment": "スタンドインによるレビューコメント。",
+        "difficulty": rng.choice(["低難易度（既存設定の応用）", "中難易度（API連携が必要）", "高難易度（全社的な調整が必要）"]),
+        "reference": "https://help.sap.com/docs/SAP_SUCCESSFACTORS_RELEASE_INFORMATION",
+        "recommendation_score": rng.choice([4, 4, 5, 5, 3]),
+        "schedule": fake_schedule(rng),
+        "cost": f"約{rng.randint(1, 20) * 50}万円",
+    }
+
+
+def answer(prompt, rng):
+    """The JSON document a well-behaved model would return for prompt."""
+    ids = _ID_RE.findall(prompt)
+    if ids:
+        return [{"id": idea_id, **fake_idea(rng)} for idea_id in ids]
+    match = re.search(r"^タイトル: (.+)$", prompt, re.M)
+    if match:
+        return fake_idea(rng, title=match.group(1).strip())
+    return fake_idea(rng)
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            path = self.path.split("?", 1)[0]
+            match = _PATH_RE.match(path)
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": {"code": 400, "message": "invalid JSON body", "status": "INVALID_ARGUMENT"}})
+            if not match:
+                return self._send(404, {"error": {"code": 404, "message": f"unknown path {path}", "status": "NOT_FOUND"}})
+
+            prompt = "".join(
+                part.get("text", "")
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            time.sleep(config.latency())
+            outcome = config.outcome()
+            if outcome == "error":
+                status = config.random.choice([500, 503])
+                return self._send(status, {"error": {"code": status, "message": "stand-in failure", "status": "UNAVAILABLE"}})
+            if outcome == "rate_limit":
+                return self._send(429, {"error": {"code": 429, "message": "stand-in quota", "status": "RESOURCE_EXHAUSTED"}})
+
+            with config.lock:
+                text = json.dumps(answer(prompt, config.random), ensure_ascii=False)
+            if outcome == "malformed":
+                text = text[: len(text) // 2]
+            prompt_tokens = len(prompt)
+            output_tokens = len(text)
+            self._send(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens,
+                },
+                "modelVersion": match.group(1),
+            })
+
+    return Handler
+
+
+def start_standin(config, host="127.0.0.1", port=0):
+    """Serves the stand-in on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="gemini-standin").start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-median", type=float, default=1.0, help="median response time in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="log-normal sigma (0 = constant latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500/503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of truncated JSON answers")
+    parser.add_argument("--seed", type=int, help="seed for latencies, failures and answers")
+
+
+def config_from_args(args):
+    return StandinConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config_from_args(args)))
+    print(f"Gemini stand-in listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
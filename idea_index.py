@@ -0,0 +1,189 @@
+import base64
+import bisect
+import json
+import threading
+from collections import defaultdict
+
+from idea_store import get_store
+
+# Facets with an inverted index; see facet_values() for how each is derived
+FACETS = ("target", "module", "audience", "persona")
+
+
+def split_modules(value):
+    """Splits the comma-separated `modules` field."""
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [m.strip() for m in str(value or "").split(",") if m.strip()]
+
+
+def split_audience(value):
+    """Splits the `・`-separated `target_audience` field."""
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [a.strip() for a in str(value or "").split("・") if a.strip()]
+
+
+def facet_values(idea):
+    target = idea.get("target")
+    return {
+        "target": [str(t) for t in (target if isinstance(target, list) else [target]) if t],
+        "module": split_modules(idea.get("modules")),
+        "audience": split_audience(idea.get("target_audience")),
+        "persona": [idea["persona"]] if idea.get("persona") else [],
+    }
+
+
+def _score(idea):
+    try:
+        return int(idea.get("recommendation_score", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class IdeaIndex:
+    """
+    In-memory inverted indexes (facet value -> ids) and sorted orders over
+    the store, kept current by replaying the store's changes feed, so a
+    filter is a set intersection and a refresh costs O(changes).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.revision = self.store.revision()
+        self._postings = {facet: defaultdict(set) for facet in FACETS}
+        self._keys = {}  # id -> (facet values, updated_at key, score key)
+        self._by_updated = []  # sorted (updated_at, id)
+        self._by_score = []  # sorted (score, updated_at, id)
+        for idea in self.store.all():
+            self._add(idea)
+
+    def _add(self, idea):
+        idea_id = idea["id"]
+        values = facet_values(idea)
+        for facet, vals in values.items():
+            for v in vals:
+                self._postings[facet][v].add(idea_id)
+        updated_key = (str(idea.get("updated_at", "")), idea_id)
+        score_key = (_score(idea), str(idea.get("updated_at", "")), idea_id)
+        bisect.insort(self._by_updated, updated_key)
+        bisect.insort(self._by_score, score_key)
+        self._keys[idea_id] = (values, updated_key, score_key)
+
+    def _remove(self, idea_id):
+        entry = self._keys.pop(idea_id, None)
+        if entry is None:
+            return
+        values, updated_key, score_key = entry
+        for facet, vals in values.items():
+            postings = self._postings[facet]
+            for v in vals:
+                postings[v].discard(idea_id)
+                if not postings[v]:
+                    del postings[v]
+        _remove_sorted(self._by_updated, updated_key)
+        _remove_sorted(self._by_score, score_key)
+
+    def refresh(self):
+        """Applies store changes since the last refresh."""
+        if self.store.revision() == self.revision:
+            return
+        with self._lock:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self._rebuild()
+                return
+            for idea_id in delta["removed"]:
+                self._remove(idea_id)
+            for idea in delta["changed"]:
+                self._remove(idea["id"])
+                self._add(idea)
+            self.revision = delta["revision"]
+
+    def query(self, sort="default", limit=None, cursor=None, **filters):
+        """
+        Ids matching every given facet filter (target=, module=, audience=,
+        persona=), ordered by sort: "default" (newest first), "desc" or "asc"
+        (by recommendation score, then updated_at). Returns (ids, next_cursor).
+        """
+        self.refresh()
+        with self._lock:
+            candidates = None
+            for facet, value in filters.items():
+                if value is None:
+                    continue
+                if facet not in self._postings:
+                    raise ValueError(f"unknown filter: {facet}")
+                ids = self._postings[facet].get(value, set())
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    break
+
+            if sort == "default":
+                order = reversed(self._by_updated)
+            elif sort == "desc":
+                order = reversed(self._by_score)
+            elif sort == "asc":
+                order = iter(self._by_score)
+            else:
+                raise ValueError(f"unknown sort: {sort}")
+
+            if candidates is None:
+                ids = [key[-1] for key in order]
+            elif len(candidates) * 8 < len(self._keys):
+                # Small result: sorting it beats walking the whole order
+                key_index = 1 if sort == "default" else 2
+                ids = [key[-1] for key in sorted((self._keys[i][key_index] for i in candidates), reverse=sort != "asc")]
+            else:
+                ids = [key[-1] for key in order if key[-1] in candidates]
+
+        offset = _decode_offset(cursor) if cursor else 0
+        if limit is None:
+            return ids[offset:], None
+        page = ids[offset:offset + limit]
+        next_cursor = _encode_offset(offset + limit) if offset + limit < len(ids) else None
+        return page, next_cursor
+
+    def facets(self):
+        """{facet: [{"value", "count"}]} sorted by value."""
+        self.refresh()
+        with self._lock:
+            return {
+                facet: [{"value": v, "count": len(ids)} for v, ids in sorted(postings.items())]
+                for facet, postings in self._postings.items()
+            }
+
+
+def _remove_sorted(keys, key):
+    i = bisect.bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
+def _encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode().rstrip("=")
+
+
+def _decode_offset(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["o"])
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide IdeaIndex over get_store()."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = IdeaIndex(get_store())
+    return _index
@@ -0,0 +1,217 @@
+import math
+import re
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator, model_validator
+
+ACTOR_OVERALL = "全体"
+ACTOR_VENDOR = "ベンダー"
+ACTOR_CLIENT = "顧客"
+# Gantt rows in render order: readers colour them by position
+TRACK_NAMES = ("全体スケジュール", "ベンダー (導入)", "企業側 (人事・情シス)")
+
+# Legacy tasks carry "V: A,R / C: C" (vendor / client RACI) instead of an actor
+_RACI_VENDOR_RE = re.compile(r"V:\s*([A-Za-z,]+)")
+_RACI_CLIENT_RE = re.compile(r"C:\s*([A-Za-z,]+)")
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(週|ヶ月|ケ月|カ月|か月|ヵ月|月|日|week|month|day)", re.IGNORECASE)
+_WEEKS_PER_UNIT = {"週": 1, "week": 1, "日": 1 / 5, "day": 1 / 5}
+
+
+def actor_from_raci(raci):
+    """全体 / ベンダー / 顧客: whoever is Accountable or Responsible (both or neither: 全体)."""
+    v_match = _RACI_VENDOR_RE.search(raci)
+    c_match = _RACI_CLIENT_RE.search(raci)
+    vendor = bool(v_match and ("A" in v_match.group(1) or "R" in v_match.group(1)))
+    client = bool(c_match and ("A" in c_match.group(1) or "R" in c_match.group(1)))
+    if vendor and not client:
+        return ACTOR_VENDOR
+    if client and not vendor:
+        return ACTOR_CLIENT
+    return ACTOR_OVERALL
+
+
+def duration_weeks(text):
+    """Weeks in "2週間", "1ヶ月", "10日" ...; None if there is no recognisable duration."""
+    match = _DURATION_RE.search(str(text or ""))
+    if not match:
+        return None
+    return float(match.group(1)) * _WEEKS_PER_UNIT.get(match.group(2).lower(), 4)
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def recommendation_score(value, default=3):
+    """A 1-5 int from whatever the LLM or an old record gave ("4", 4.0, None ...)."""
+    try:
+        return min(5, max(1, int(float(value))))
+    except (TypeError, ValueError):
+        return default
+
+
+class Task(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    phase: str = ""
+    name: str = ""
+    duration: str = ""
+    dependency: str = ""
+    actor: str = ""
+
+    @field_validator("phase", "name", "duration", "dependency", "actor", mode="before")
+    @classmethod
+    def _as_text(cls, value):
+        return _text(value)
+
+    @model_validator(mode="after")
+    def _derive_actor(self):
+        if not self.actor:
+            raci = (self.model_extra or {}).get("raci")
+            self.actor = actor_from_raci(str(raci)) if raci else ACTOR_OVERALL
+        return self
+
+
+class TrackItem(BaseModel):
+    name: str = ""
+    start: int = 1
+    end: int = 1
+
+    @field_validator("name", mode="before")
+    @classmethod
+    def _as_text(cls, value):
+        return _text(value)
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        self.start = max(1, self.start)
+        self.end = max(self.start, self.end)
+        return self
+
+
+class Track(BaseModel):
+    name: str = ""
+    items: list[TrackItem] = []
+
+
+def _bars(tracks, name, start, end, vendor_tasks, client_tasks):
+    tracks[0]["items"].append({"name": name, "start": start, "end": end})
+    if vendor_tasks:
+        tracks[1]["items"].append({"name": " / ".join(vendor_tasks), "start": start, "end": end})
+    if client_tasks:
+        tracks[2]["items"].append({"name": " / ".join(client_tasks), "start": start, "end": end})
+
+
+def _from_phases(phases):
+    """Legacy shape: one element per month, each with its phase name and tasks."""
+    tracks = [{"name": n, "items": []} for n in TRACK_NAMES]
+    tasks = []
+    for i, phase in enumerate(phases):
+        month = i + 1
+        phase_name = _text(phase.get("phase") or phase.get("month")) or f"Phase {month}"
+        phase_tasks = [Task.model_validate({**t, "phase": phase_name}) for t in phase.get("tasks") or [] if isinstance(t, dict)]
+        tasks.extend(phase_tasks)
+        _bars(tracks, phase_name, month, month,
+              [t.name for t in phase_tasks if t.actor == ACTOR_VENDOR],
+              [t.name for t in phase_tasks if t.actor == ACTOR_CLIENT])
+    return {"durations": max(1, len(phases)), "tracks": tracks, "tasks": tasks}
+
+
+def _from_tasks(items):
+    """
+    Flat task list as the generation prompt asks for. Phases run one after
+    another in order of first appearance, each lasting as long as its
+    longest task (whole months, at least one).
+    """
+    tasks = [Task.model_validate(t) for t in items if isinstance(t, dict)]
+    phases = {}
+    for task in tasks:
+        phases.setdefault(task.phase or "実施", []).append(task)
+    tracks = [{"name": n, "items": []} for n in TRACK_NAMES]
+    month = 1
+    for phase_name, phase_tasks in phases.items():
+        weeks = max((duration_weeks(t.duration) or 0) for t in phase_tasks)
+        months = max(1, math.ceil(weeks / 4))
+        _bars(tracks, phase_name, month, month + months - 1,
+              [t.name for t in phase_tasks if t.actor == ACTOR_VENDOR],
+              [t.name for t in phase_tasks if t.actor == ACTOR_CLIENT])
+        month += months
+    return {"durations": max(1, month - 1), "tracks": tracks, "tasks": tasks}
+
+
+class Schedule(BaseModel):
+    """
+    The one schedule shape readers get: Gantt tracks (overall, vendor,
+    client) of month bars, plus the task table with an actor per task.
+    Legacy per-month phase lists and flat task lists are converted on
+    validation.
+    """
+
+    durations: int = 1
+    tracks: list[Track] = []
+    tasks: list[Task] = []
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_any_shape(cls, value):
+        if isinstance(value, list):
+            if any(isinstance(p, dict) and isinstance(p.get("tasks"), list) for p in value):
+                return _from_phases([p for p in value if isinstance(p, dict)])
+            return _from_tasks(value)
+        if isinstance(value, dict) and "tracks" not in value and isinstance(value.get("tasks"), list):
+            return _from_tasks(value["tasks"])
+        return value
+
+    @model_validator(mode="after")
+    def _cover_every_bar(self):
+        last = max((item.end for track in self.tracks for item in track.items), default=1)
+        self.durations = max(1, self.durations, last)
+        return self
+
+
+class Idea(BaseModel):
+    """
+    A stored idea. Only the fields readers compute with are typed; the rest
+    pass through unchanged.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    title: str = ""
+    persona: str = ""
+    recommendation_score: int = 3
+    schedule: Optional[Schedule] = None
+
+    @field_validator("title", "persona", mode="before")
+    @classmethod
+    def _as_text(cls, value):
+        return _text(value)
+
+    @field_validator("recommendation_score", mode="before")
+    @classmethod
+    def _score(cls, value):
+        return recommendation_score(value)
+
+    @field_validator("schedule", mode="before")
+    @classmethod
+    def _schedule(cls, value):
+        if not value or not isinstance(value, (dict, list)):
+            return None
+        try:
+            return Schedule.model_validate(value)
+        except ValidationError:
+            # A schedule we cannot read is dropped rather than failing the idea
+            return None
+
+
+def normalize_idea(idea):
+    """The idea in canonical form (see Schedule); "no schedule" is {}."""
+    data = Idea.model_validate(idea).model_dump()
+    if data["schedule"] is None:
+        data["schedule"] = {}
+    return data
@@ -0,0 +1,388 @@
+import base64
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from idea_model import normalize_idea
+from minhash import SIGNATURE_VERSION, idea_signature, pack
+
+DB_FILE = os.getenv("IDEAS_DB", "ideas.db")
+LEGACY_JSON_FILE = "ideas.json"
+# Tombstones kept for the changes feed; clients further behind must resync
+TOMBSTONE_RETENTION = int(os.getenv("TOMBSTONE_RETENTION", "1000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ideas (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    recommendation_score INTEGER NOT NULL DEFAULT 3,
+    revision INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    minhash BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_ideas_updated_at_id ON ideas (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_ideas_score ON ideas (recommendation_score, updated_at);
+CREATE INDEX IF NOT EXISTS idx_ideas_title ON ideas (title);
+CREATE TABLE IF NOT EXISTS tombstones (
+    id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    deleted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_tombstones_revision ON tombstones (revision);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Heavy fields only shown in a card's detail section; left out of fields=summary
+DETAIL_FIELDS = ("approach", "rationale", "schedule")
+SUMMARY_DATA = "json_remove(data, " + ", ".join(f"'$.{f}'" for f in DETAIL_FIELDS) + ")"
+
+UPSERT_SQL = """
+INSERT INTO ideas (id, title, updated_at, recommendation_score, data, minhash, revision)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    title = excluded.title,
+    updated_at = excluded.updated_at,
+    recommendation_score = excluded.recommendation_score,
+    revision = excluded.revision,
+    data = excluded.data,
+    minhash = excluded.minhash
+"""
+
+# Columns added after the first release, applied to databases that predate them
+COLUMN_UPGRADES = {
+    "revision": "ALTER TABLE ideas ADD COLUMN revision INTEGER NOT NULL DEFAULT 0",
+    # MinHash signature of title + approach, for near-duplicate detection
+    "minhash": "ALTER TABLE ideas ADD COLUMN minhash BLOB",
+}
+
+
+class IdeaStore:
+    """
+    SQLite-backed idea storage. Each idea is kept as one row (the full JSON
+    document plus the columns we sort/filter on), so a review or a removal
+    only touches that row instead of rewriting the whole corpus.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        with conn:
+            conn.executescript(SCHEMA)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(ideas)")}
+            for column, ddl in COLUMN_UPGRADES.items():
+                if column not in columns:
+                    conn.execute(ddl)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ideas_revision ON ideas (revision)")
+            # Superseded by idx_ideas_updated_at_id, which also serves keyset pagination
+            conn.execute("DROP INDEX IF EXISTS idx_ideas_updated_at")
+            # Signatures made by another version of minhash are not comparable
+            row = conn.execute("SELECT value FROM meta WHERE key = 'minhash_version'").fetchone()
+            if row is None or int(row[0]) != SIGNATURE_VERSION:
+                conn.execute("UPDATE ideas SET minhash = NULL")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('minhash_version', ?)",
+                             (SIGNATURE_VERSION,))
+            # Rows written before the minhash column existed, or with stale signatures
+            rows = conn.execute("SELECT id, data FROM ideas WHERE minhash IS NULL").fetchall()
+            conn.executemany(
+                "UPDATE ideas SET minhash = ? WHERE id = ?",
+                [(pack(idea_signature(json.loads(data))), idea_id) for idea_id, data in rows],
+            )
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads, and both the
+        # FastAPI threadpool and the Streamlit script runner use several.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_values(idea):
+        # Normalized once here, so every reader gets the canonical shape.
+        # Called before taking _write_lock (normalizing and hashing are the
+        # slow part of a write); the revision is appended under it.
+        idea = normalize_idea(idea)
+        return (
+            idea["id"],
+            str(idea.get("title", "")),
+            str(idea.get("updated_at", "")),
+            _score(idea),
+            json.dumps(idea, ensure_ascii=False),
+            pack(idea_signature(idea)),
+        )
+
+    @staticmethod
+    def _bump_revision(conn):
+        # Runs inside the caller's write transaction, so the revision and the
+        # row change it describes are committed together
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+        return int(conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0])
+
+    # --- Reads ---
+    def all(self):
+        """Returns every idea sorted by updated_at descending."""
+        rows = self._conn().execute("SELECT data FROM ideas ORDER BY updated_at DESC, id DESC").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def page(self, limit, cursor=None, fields="full"):
+        """
+        One page of ideas in (updated_at, id) descending order, using the
+        cursor from the previous page as the keyset bound. Returns
+        (ideas, next_cursor); next_cursor is None on the last page.
+        fields="summary" leaves out DETAIL_FIELDS.
+        """
+        column = SUMMARY_DATA if fields == "summary" else "data"
+        if cursor:
+            updated_at, idea_id = decode_cursor(cursor)
+            rows = self._conn().execute(
+                f"SELECT {column}, updated_at, id FROM ideas WHERE (updated_at, id) < (?, ?) "
+                "ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (updated_at, idea_id, limit + 1),
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                f"SELECT {column}, updated_at, id FROM ideas ORDER BY updated_at DESC, id DESC LIMIT ?",
+                (limit + 1,),
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][2])
+        return [json.loads(r[0]) for r in rows], next_cursor
+
+    def get(self, idea_id):
+        row = self._conn().execute("SELECT data FROM ideas WHERE id = ?", (idea_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, idea_ids, fields="full"):
+        """Ideas for the given ids, in the same order (missing ids are skipped)."""
+        column = SUMMARY_DATA if fields == "summary" else "data"
+        found = {}
+        ids = list(idea_ids)
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self._conn().execute(
+                f"SELECT id, {column} FROM ideas WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((r[0], r[1]) for r in rows)
+        return [json.loads(found[i]) for i in ids if i in found]
+
+    def signatures(self, idea_ids=None):
+        """{id: packed MinHash signature} for the given ids (default: every idea)."""
+        if idea_ids is None:
+            return dict(self._conn().execute("SELECT id, minhash FROM ideas WHERE minhash IS NOT NULL"))
+        found = {}
+        ids = list(idea_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            found.update(self._conn().execute(
+                f"SELECT id, minhash FROM ideas WHERE minhash IS NOT NULL AND id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return found
+
+    def scan(self, batch_size=500):
+        """
+        Every idea in batches of batch_size, in id order. Pages by keyset on
+        the primary key, so memory stays at one batch and rows rewritten
+        meanwhile are neither skipped nor revisited.
+        """
+        last_id = ""
+        while True:
+            rows = self._conn().execute(
+                "SELECT id, data FROM ideas WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [json.loads(r[1]) for r in rows]
+
+    def meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM ideas").fetchone()[0]
+
+    def revision(self):
+        """
+        Global revision, bumped on every insert, update and delete. A single
+        primary-key lookup, independent of corpus size.
+        """
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def version(self):
+        """Change token for caches."""
+        return self.revision()
+
+    def changes(self, since):
+        """
+        Ideas inserted or updated after revision `since`, plus the ids removed
+        since then. Everything is read from one snapshot of the database.
+        If tombstones older than `since` were already pruned (or `since` is
+        from another database), returns reset=True and the client has to
+        reload the full list.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+            revision = int(row[0]) if row else 0
+            row = conn.execute("SELECT value FROM meta WHERE key = 'tombstone_floor'").fetchone()
+            floor = int(row[0]) if row else 0
+            if since < floor or since > revision:
+                return {"revision": revision, "reset": True, "changed": [], "removed": []}
+            changed = conn.execute(
+                "SELECT data FROM ideas WHERE revision > ? ORDER BY updated_at DESC, id DESC", (since,)
+            ).fetchall()
+            removed = conn.execute(
+                "SELECT id FROM tombstones WHERE revision > ? ORDER BY revision", (since,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return {
+            "revision": revision,
+            "reset": False,
+            "changed": [json.loads(r[0]) for r in changed],
+            "removed": [r[0] for r in removed],
+        }
+
+    # --- Writes ---
+    def upsert(self, idea):
+        """Inserts or updates one idea; returns the new global revision."""
+        row = self._row_values(idea)
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                revision = self._bump_revision(conn)
+                conn.execute(UPSERT_SQL, row + (revision,))
+                conn.execute("DELETE FROM tombstones WHERE id = ?", (idea["id"],))
+        return revision
+
+    def upsert_many(self, ideas):
+        """Writes several ideas in one transaction under one new revision; returns it."""
+        rows = [self._row_values(idea) for idea in ideas]
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                revision = self._bump_revision(conn)
+                conn.executemany(UPSERT_SQL, [row + (revision,) for row in rows])
+                conn.executemany("DELETE FROM tombstones WHERE id = ?", [(row[0],) for row in rows])
+        return revision
+
+    def set_meta(self, key, value):
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def delete(self, idea_id):
+        """Deletes one idea; returns the new global revision, or None if it did not exist."""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                cur = conn.execute("DELETE FROM ideas WHERE id = ?", (idea_id,))
+                if cur.rowcount == 0:
+                    return None
+                revision = self._bump_revision(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO tombstones (id, revision) VALUES (?, ?)", (idea_id, revision)
+                )
+                self._prune_tombstones(conn)
+        return revision
+
+    @staticmethod
+    def _prune_tombstones(conn):
+        row = conn.execute(
+            "SELECT revision FROM tombstones ORDER BY revision DESC LIMIT 1 OFFSET ?", (TOMBSTONE_RETENTION,)
+        ).fetchone()
+        if row:
+            conn.execute("DELETE FROM tombstones WHERE revision <= ?", (row[0],))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('tombstone_floor', ?)", (row[0],))
+
+    def import_json(self, path=LEGACY_JSON_FILE):
+        """
+        One-shot import of a legacy ideas.json file. Runs at most once per
+        database; returns the number of imported ideas.
+        """
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'imported_from'").fetchone():
+            return 0
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            ideas = json.load(f)
+        rows = [self._row_values(i) for i in ideas if i.get("id")]
+        with self._write_lock:
+            with conn:
+                revision = self._bump_revision(conn)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO ideas (id, title, updated_at, recommendation_score, data, minhash, revision) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [row + (revision,) for row in rows],
+                )
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('imported_from', ?)", (path,))
+        return len(ideas)
+
+
+def encode_cursor(updated_at, idea_id):
+    raw = json.dumps([updated_at, idea_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, idea_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+    return str(updated_at), str(idea_id)
+
+
+def _score(idea):
+    try:
+        return int(idea.get("recommendation_score", 3))
+    except (TypeError, ValueError):
+        return 3
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide IdeaStore, seeded from ideas.json and migrated on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                # migrations imports this module
+                from migrations import migrate_on_open
+                store = IdeaStore()
+                if store.count() == 0:
+                    store.import_json()
+                migrate_on_open(store)
+                _store = store
+    return _store
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else LEGACY_JSON_FILE
+    n = IdeaStore().import_json(src)
+    print(f"Imported {n} ideas from {src} into {DB_FILE}.")
@@ -0,0 +1,146 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """
+    Parses a streamed top-level JSON object member by member. feed() takes
+    the next chunk of text and returns the members completed by it, so a
+    short "title" is available long before a long "schedule" is finished.
+
+    Strings, arrays and objects are complete once json can decode them;
+    numbers and literals only once the delimiter after them has arrived
+    ("12" may still become "123").
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+
+    def _skip(self, chars=_WHITESPACE):
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in chars:
+            self.pos += 1
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = {}
+        while not self.finished:
+            self._skip()
+            if not self.started:
+                if self.pos >= len(self.buffer):
+                    break
+                if self.buffer[self.pos] != "{":
+                    raise ValueError("streamed JSON is not an object")
+                self.pos += 1
+                self.started = True
+                continue
+
+            start = self.pos
+            self._skip(_WHITESPACE + ",")
+            if self.pos < len(self.buffer) and self.buffer[self.pos] == "}":
+                self.pos += 1
+                self.finished = True
+                break
+            member = self._member()
+            if member is None:
+                # Incomplete: retry from the same place once more text arrives
+                self.pos = start
+                break
+            key, value = member
+            self.fields[key] = value
+            completed[key] = value
+        return completed
+
+    def _member(self):
+        try:
+            key, pos = self._decoder.raw_decode(self.buffer, self.pos)
+        except ValueError:
+            return None
+        while pos < len(self.buffer) and self.buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(self.buffer):
+            return None
+        if self.buffer[pos] != ":":
+            raise ValueError(f"expected ':' after key {key!r}")
+        pos += 1
+        while pos < len(self.buffer) and self.buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(self.buffer):
+            return None
+        scalar = self.buffer[pos] not in "\"[{"
+        try:
+            value, end = self._decoder.raw_decode(self.buffer, pos)
+        except ValueError:
+            return None
+        if scalar:
+            rest = end
+            while rest < len(self.buffer) and self.buffer[rest] in _WHITESPACE:
+                rest += 1
+            if rest >= len(self.buffer):
+                return None
+        self.pos = end
+        return key, value
+
+
+def iter_array(fp, chunk_size=1 << 16):
+    """
+    Yields the elements of the top-level JSON array in text file `fp`, one at
+    a time. Only the element being decoded and the unread rest of the current
+    chunk are held in memory, so the file can be far larger than RAM.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    state = "start"  # start -> first (after "[") -> element / separator ...
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("unexpected end of JSON array")
+            fill()
+            continue
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValueError("JSON document is not an array")
+            pos += 1
+            state = "first"
+            continue
+        if state in ("first", "separator") and char == "]":
+            return
+        if state == "separator":
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at {char!r}")
+            pos += 1
+            state = "element"
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise
+            fill()
+            continue
+        if char not in "\"[{" and not eof and (end >= len(buffer) or buffer[end] not in _WHITESPACE + ",]"):
+            # A number or literal may continue in the next chunk ("1" -> "12", "1" -> "1.5")
+            fill()
+            continue
+        pos = end
+        state = "separator"
+        yield value
@@ -0,0 +1,82 @@
+import os
+import socket
+import sqlite3
+import time
+import uuid
+
+from idea_store import DB_FILE
+
+# How long a lease stays valid without renewal; a crashed leader is replaced
+# after at most this long. Holders renew every third of it.
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", "15"))
+# Held by the running simulation, and by migrations so the two never overlap
+WORKER_LEASE = "ai_worker"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class Lease:
+    """
+    Leader election through a lease row in the ideas database: whoever holds
+    an unexpired lease under `name` is the leader, so at most one process per
+    database (i.e. per data directory) acts on it, whatever mix of uvicorn
+    workers, Streamlit processes and standalone workers is running.
+
+    try_acquire() both takes a free or expired lease and renews our own, in a
+    single conditional upsert, so two candidates cannot both win.
+    """
+
+    def __init__(self, name, path=DB_FILE, ttl=WORKER_LEASE_SECONDS):
+        self.name = name
+        self.path = path
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Called rarely and from whichever thread; a connection per call is simplest
+        return sqlite3.connect(self.path, timeout=30)
+
+    def try_acquire(self):
+        """Takes or renews the lease; True if we hold it afterwards."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                    "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                    (self.name, self.holder, now + self.ttl, now),
+                )
+                row = conn.execute("SELECT holder FROM leases WHERE name = ?", (self.name,)).fetchone()
+            return row is not None and row[0] == self.holder
+        finally:
+            conn.close()
+
+    def release(self):
+        """Gives the lease up (if we hold it) so a standby can take over at once."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+        finally:
+            conn.close()
+
+    def current(self):
+        """{"holder", "expires_in"} of the unexpired lease, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[1] < time.time():
+            return None
+        return {"holder": row[0], "expires_in": round(row[1] - time.time(), 1)}
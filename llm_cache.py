@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+CACHE_FILE = os.getenv("LLM_CACHE_DB", "llm_cache.db")
+# LRU bound on the number of cached responses
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+# Seconds a response stays fresh; 0 keeps entries until LRU eviction
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_kind ON responses (kind, key);
+"""
+
+
+def cache_key(model, prompt, config):
+    """Content address of a request: sha256 over model, prompt and config."""
+    payload = json.dumps({"model": model, "prompt": prompt, "config": config}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed cache of raw LLM response texts, keyed by cache_key().
+    Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_entries`. Hit/miss/eviction counters are per process.
+
+    In replay mode nothing expires and nothing is written: lookup() answers
+    from the recording only, so a run against a recorded cache is
+    deterministic and never touches the network.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL, replay=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, key, kind=""):
+        """
+        The cached response text for key, or None. In replay mode a key that
+        was never recorded is answered with a recorded response of the same
+        kind, picked deterministically from the key.
+        """
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT text, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and not self.replay and self.ttl and now - row[1] > self.ttl:
+            with self._lock, conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            row = None
+        if row is None and self.replay:
+            count = conn.execute("SELECT COUNT(*) FROM responses WHERE kind = ?", (kind,)).fetchone()[0]
+            if count:
+                row = conn.execute(
+                    "SELECT text, created_at FROM responses WHERE kind = ? ORDER BY key LIMIT 1 OFFSET ?",
+                    (kind, int(key, 16) % count),
+                ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not self.replay:
+            with self._lock, conn:
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def store(self, key, kind, model, text):
+        if self.replay:
+            return
+        conn = self._conn()
+        now = time.time()
+        with self._lock, conn:
+            conn.execute(
+                "INSERT INTO responses (key, kind, model, text, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET text = excluded.text, created_at = excluded.created_at, "
+                "accessed_at = excluded.accessed_at",
+                (key, kind, model, text, now, now),
+            )
+            if self.ttl:
+                self.evictions += conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.evictions += conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "replay": self.replay,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide LLMCache; LLM_REPLAY=1 opens it in replay mode."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(replay=os.getenv("LLM_REPLAY", "") not in ("", "0"))
+    return _cache
+
+
+if __name__ == "__main__":
+    # python llm_cache.py [path]: counts per kind in a recorded cache
+    conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else CACHE_FILE)
+    for kind, n in conn.execute("SELECT kind, COUNT(*) FROM responses GROUP BY kind ORDER BY kind"):
+        print(f"{kind or '-'}: {n}")
@@ -0,0 +1,425 @@
+"""
+Versioned data migrations for the idea corpus.
+
+Each migration is a numbered, idempotent per-record transform, so a run
+streams the records once and applies every pending migration to each, with
+memory bounded by one batch whatever the corpus size:
+
+- in the store (default): keyset-paged batches, each rewritten in one
+  transaction; the schema version is kept in the store's meta table
+- on a legacy JSON array file (--file): elements are streamed into a temp
+  file that atomically replaces the original; the version goes to
+  <file>.version
+
+Both hold the worker lease, so no simulation writes meanwhile. Pending
+store migrations are also applied when a process opens the store (see
+migrate_on_open) and by the worker when it becomes leader.
+
+    python migrations.py [--file ideas.json] [--dry-run] [--wait] [--list]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import textwrap
+import time
+
+from idea_model import normalize_idea
+from idea_store import IdeaStore
+from json_stream import iter_array
+from leader import WORKER_LEASE, Lease
+
+SCHEMA_VERSION_KEY = "schema_version"
+BATCH_SIZE = 500
+
+MIGRATIONS = []  # [(version, name, migrate)]
+
+
+def migration(version, name):
+    """
+    Registers migrate(idea, rng) -> bool (whether it changed the idea, which
+    it edits in place). rng is seeded from the version and the idea id, so
+    re-running a migration makes the same choices.
+    """
+    def register(migrate):
+        MIGRATIONS.append((version, name, migrate))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return migrate
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def apply_pending(idea, version):
+    """Applies every migration newer than `version` to the idea; True if any changed it."""
+    changed = False
+    for number, _, migrate in MIGRATIONS:
+        if number > version:
+            rng = random.Random(f"{number}:{idea.get('id', '')}")
+            changed = migrate(idea, rng) or changed
+    return changed
+
+
+# --- Migrations ---
+
+@migration(1, "recommendation_score")
+def add_recommendation_score(idea, rng):
+    """Random 3-5 score for ideas from before scoring (formerly update_schema.py)."""
+    if "recommendation_score" in idea:
+        return False
+    idea["recommendation_score"] = rng.randint(3, 5)
+    return True
+
+
+OLD_DEFAULT_DIFFICULTY = "高難易度（要件定義での利害調整が難航しやすい）"
+DIFFICULTIES = [
+    "低難易度（標準機能の範囲内で完結するため）",
+    "低難易度（クイックウィンとして1ヶ月で導入可能）",
+    "中難易度（一部アドオン開発が必要だが、要件は明確）",
+    "中難易度（API連携の実装工数がやや掛かるため）",
+    "中難易度（現場への操作トレーニングが主となるため）",
+    OLD_DEFAULT_DIFFICULTY,
+    "高難易度（複数部門にまたがる業務フローの再設計が必要）",
+    "高難易度（経営層の強いコミットメントが必須となるため）",
+]
+
+
+@migration(2, "vary_difficulty")
+def vary_default_difficulty(idea, rng):
+    """Replaces the old one-size-fits-all difficulty (formerly update_difficulty.py)."""
+    if idea.get("difficulty") != OLD_DEFAULT_DIFFICULTY:
+        return False
+    idea["difficulty"] = rng.choice(DIFFICULTIES)
+    return idea["difficulty"] != OLD_DEFAULT_DIFFICULTY
+
+
+# Old mock / AI reviews were appended to the approach as "【...】..."
+_APPENDED_REVIEW_RE = re.compile(r"\n+?【(?:追加検討|.*?の指摘)】.*$", re.DOTALL)
+
+
+@migration(3, "extract_review_comments")
+def extract_review_comment(idea, rng):
+    """Moves reviews appended to the approach into review_comment (formerly extract_reviews.py)."""
+    approach = idea.get("approach", "")
+    match = _APPENDED_REVIEW_RE.search(approach) if isinstance(approach, str) else None
+    if not match or idea.get("review_comment"):
+        return False
+    idea["review_comment"] = match.group(0).strip().replace("【", "").replace("】", ": ", 1)
+    idea["approach"] = approach.replace(match.group(0), "")
+    return True
+
+
+@migration(4, "varied_schedules")
+def vary_schedule(idea, rng):
+    """Retired: replaced real schedules with templated ones (formerly rewrite_ideas.py)."""
+    # Kept so that version numbers stay stable; legacy list schedules are
+    # converted, content included, by the normalize migration
+    return False
+
+
+@migration(5, "normalize")
+def normalize(idea, rng):
+    """Canonical shape of idea_model (the store also normalizes on every write)."""
+    normalized = normalize_idea(idea)
+    if normalized == idea:
+        return False
+    idea.clear()
+    idea.update(normalized)
+    return True
+
+
+def varied_schedule(rng):
+    """A 3-7 month schedule from the standard phase templates (for synthetic corpora)."""
+    # Total months varies between 3 and 7
+    total_months = rng.randint(3, 7)
+
+    # We define standard phases based on total months
+
+    overall_items = []
+    vendor_items = []
+    client_items = []
+    task_list = []
+
+    if total_months <= 3:
+        overall_items = [
+            {"name": "要件定義", "start": 1, "end": 1},
+            {"name": "開発・実装", "start": 2, "end": 2},
+            {"name": "テスト・リリース", "start": 3, "end": 3}
+        ]
+        vendor_items = [
+            {"name": "システム要件定義", "start": 1, "end": 1},
+            {"name": "システム構築", "start": 2, "end": 2},
+            {"name": "結合テスト・本番展開", "start": 3, "end": 3}
+        ]
+        client_items = [
+            {"name": "業務要件整理", "start": 1, "end": 1},
+            {"name": "既存データ整理", "start": 1, "end": 2},
+            {"name": "UAT・マニュアル", "start": 3, "end": 3}
+        ]
+        task_list = [
+            {"phase": "要件定義", "name": "業務課題とToBeフローの策定", "duration": "2週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "要件定義", "name": "システム要件ヒアリング・Fit&Gap", "duration": "2週間", "dependency": "ToBeフロー策定後", "actor": "ベンダー"},
+            {"phase": "開発・実装", "name": "SuccessFactors基本設定・拡張開発", "duration": "3週間", "dependency": "要件定義完了", "actor": "ベンダー"},
+            {"phase": "開発・実装", "name": "移行用データクレンジング", "duration": "4週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "テスト・リリース", "name": "結合テスト・移行リハーサル", "duration": "2週間", "dependency": "開発完了", "actor": "ベンダー"},
+            {"phase": "テスト・リリース", "name": "UAT（受入テスト）", "duration": "1週間", "dependency": "結合テスト完了", "actor": "顧客"},
+            {"phase": "テスト・リリース", "name": "社内マニュアル作成・展開", "duration": "2週間", "dependency": "UAT完了", "actor": "顧客"}
+        ]
+    elif total_months == 4:
+        overall_items = [
+            {"name": "企画・要件定義", "start": 1, "end": 1},
+            {"name": "プロトタイプ構築", "start": 2, "end": 2},
+            {"name": "本番実装", "start": 3, "end": 3},
+            {"name": "テスト・移行", "start": 4, "end": 4}
+        ]
+        vendor_items = [
+            {"name": "システム要件定義", "start": 1, "end": 1},
+            {"name": "設定・レビュー", "start": 2, "end": 2},
+            {"name": "本番環境構築・開発", "start": 3, "end": 3},
+            {"name": "テスト・運用引き継ぎ", "start": 4, "end": 4}
+        ]
+        client_items = [
+            {"name": "企画策定", "start": 1, "end": 1},
+            {"name": "評価・フィードバック", "start": 2, "end": 2},
+            {"name": "実データ準備", "start": 2, "end": 3},
+            {"name": "受入テスト・周知", "start": 4, "end": 4}
+        ]
+        task_list = [
+            {"phase": "企画・要件定義", "name": "導入目的の明確化・KPI設定", "duration": "2週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "企画・要件定義", "name": "システム要件・データ要件定義", "duration": "2週間", "dependency": "導入目的明確化後", "actor": "ベンダー"},
+            {"phase": "プロトタイプ構築", "name": "標準機能によるプロトタイプ作成", "duration": "2週間", "dependency": "要件定義完了", "actor": "ベンダー"},
+            {"phase": "プロトタイプ構築", "name": "プロトタイプ触込・Gap特定", "duration": "2週間", "dependency": "プロトタイプ作成後", "actor": "顧客"},
+            {"phase": "本番実装", "name": "本番環境構築・権限設定", "duration": "3週間", "dependency": "Gap合意後", "actor": "ベンダー"},
+            {"phase": "本番実装", "name": "マスタデータ登録", "duration": "1週間", "dependency": "構築着手", "actor": "顧客"},
+            {"phase": "テスト・移行", "name": "システム結合テスト", "duration": "2週間", "dependency": "実装完了", "actor": "ベンダー"},
+            {"phase": "テスト・移行", "name": "受入テスト・本番稼働", "duration": "2週間", "dependency": "結合テスト完了", "actor": "顧客"}
+        ]
+    elif total_months == 5:
+        overall_items = [
+            {"name": "要件定義", "start": 1, "end": 1},
+            {"name": "基本設計", "start": 2, "end": 2},
+            {"name": "詳細設計・構築", "start": 3, "end": 4},
+            {"name": "テスト・リリース", "start": 5, "end": 5}
+        ]
+        vendor_items = [
+            {"name": "要件ヒアリング", "start": 1, "end": 1},
+            {"name": "基本設計", "start": 2, "end": 2},
+            {"name": "詳細設計・構築", "start": 3, "end": 4},
+            {"name": "テスト・移行計画", "start": 5, "end": 5}
+        ]
+        client_items = [
+            {"name": "業務フローToBe策定", "start": 1, "end": 1},
+            {"name": "承認プロセス決定", "start": 2, "end": 2},
+            {"name": "データクレンジング", "start": 2, "end": 4},
+            {"name": "UAT・展開準備", "start": 5, "end": 5}
+        ]
+        task_list = [
+            {"phase": "要件定義", "name": "現行課題の洗い出し・ToBe定義", "duration": "3週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "要件定義", "name": "システム化要件の整理", "duration": "2週間", "dependency": "ToBe定義開始後", "actor": "ベンダー"},
+            {"phase": "基本設計", "name": "モジュール構成・連携方式設計", "duration": "3週間", "dependency": "要件定義完了", "actor": "ベンダー"},
+            {"phase": "基本設計", "name": "決裁・承認ルートの確定", "duration": "2週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "詳細設計・構築", "name": "カスタムオブジェクト開発・UI設定", "duration": "6週間", "dependency": "基本設計完了", "actor": "ベンダー"},
+            {"phase": "詳細設計・構築", "name": "移行対象データの抽出・加工", "duration": "6週間", "dependency": "なし", "actor": "顧客"},
+            {"phase": "テスト・リリース", "name": "総合テスト・パフォーマンス検証", "duration": "2週間", "dependency": "構築完了", "actor": "ベンダー"},
+            {"phase": "テスト・リリース", "name": "業務シナリオテスト (UAT)", "duration": "2週間", "dependency": "総合テスト完了後", "actor": "顧客"}
+        ]
+    else: # 6 or 7 months
+        total=total_months
+        overall_items = [
+            {"name": "要件定義", "start": 1, "end": 1},
+            {"name": "設計", "start": 2, "end": 3},
+            {"name": "構築", "start": 4, "end": total-1},
+            {"name": "テスト・本番", "start": total, "end": total}
+        ]
+        vendor_items = [
+            {"name": "要件定義支援", "start": 1, "end": 1},
+            {"name": "システム設計", "start": 2, "end": 3},
+            {"name": "実装・単体テスト", "start": 4, "end": total-1},
+            {"name": "総合テスト・稼働支援", "start": total, "end": total}
+        ]
+        client_items = [
+            {"name": "業務要件確定", "start": 1, "end": 1},
+            {"name": "データ移行方針決定", "start": 2, "end": 3},
+            {"name": "データ移行作業", "start": 3, "end": total-1},
+            {"name": "UAT・本番移行判定", "start": total, "end": total}
+        ]
+        task_list = [
+            {"phase": "要件定義", "name": "プロジェクト憲章・体制構築", "duration": "2週間", "dependency": "なし", "actor": "全体"},
+            {"phase": "要件定義", "name": "業務要件定義・ギャップ分析", "duration": "4週間", "dependency": "体制構築後", "actor": "ベンダー"},
+            {"phase": "要件定義", "name": "システム外運用ルールの策定", "duration": "3週間", "dependency": "ギャップ分析後", "actor": "顧客"},
+            {"phase": "設計", "name": "統合データモデル設計", "duration": "5週間", "dependency": "要件定義完了", "actor": "ベンダー"},
+            {"phase": "構築", "name": "コア機能実装・連携API開発", "duration": str((total-3)*4) + "週間", "dependency": "設計完了", "actor": "ベンダー"},
+            {"phase": "構築", "name": "テストシナリオ作成", "duration": "3週間", "dependency": "実装後半", "actor": "顧客"},
+            {"phase": "構築", "name": "本番系データセットアップ", "duration": "4週間", "dependency": "開発完了前", "actor": "顧客"},
+            {"phase": "テスト・本番", "name": "システム結合・総合テスト", "duration": "2週間", "dependency": "実装完了", "actor": "ベンダー"},
+            {"phase": "テスト・本番", "name": "UAT（ユーザー受入テスト）", "duration": "2週間", "dependency": "総合テスト後", "actor": "顧客"}
+        ]
+
+    return {
+        "durations": total_months,
+        "tracks": [
+            {"name": "全体スケジュール", "items": overall_items},
+            {"name": "ベンダー (導入)", "items": vendor_items},
+            {"name": "企業側 (人事・情シス)", "items": client_items}
+        ],
+        "tasks": task_list
+    }
+
+
+# --- Runners ---
+
+class LeaseKeeper:
+    """Renews the worker lease during a long run (every third of its ttl)."""
+
+    def __init__(self, lease):
+        self.lease = lease
+        self.renewed = time.monotonic()
+
+    def __call__(self):
+        if self.lease is None or time.monotonic() - self.renewed < self.lease.ttl / 3:
+            return
+        if not self.lease.try_acquire():
+            raise RuntimeError("lost the worker lease during the migration")
+        self.renewed = time.monotonic()
+
+
+def migrate_store(store, lease=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Brings the store to latest_version(). Each batch is rewritten in its own
+    transaction, so an interrupted run leaves a consistent store and simply
+    re-applies the (idempotent) migrations next time.
+    Returns {"from", "to", "scanned", "changed"}.
+    """
+    version = int(store.meta(SCHEMA_VERSION_KEY, 0))
+    result = {"from": version, "to": max(version, latest_version()), "scanned": 0, "changed": 0}
+    if version >= latest_version():
+        return result
+    keep_lease = LeaseKeeper(lease)
+    for batch in store.scan(batch_size):
+        changed = [idea for idea in batch if apply_pending(idea, version)]
+        result["scanned"] += len(batch)
+        result["changed"] += len(changed)
+        if changed and not dry_run:
+            store.upsert_many(changed)
+        keep_lease()
+    if not dry_run:
+        store.set_meta(SCHEMA_VERSION_KEY, result["to"])
+    return result
+
+
+def migrate_on_open(store):
+    """
+    Applies pending migrations as the store is opened, so that readers get
+    migrated rows even when no worker runs. Takes the worker lease for the
+    run; if another process holds it, that leader migrated on taking it.
+    Returns migrate_store()'s result, or None if nothing was run.
+    """
+    if int(store.meta(SCHEMA_VERSION_KEY, 0)) >= latest_version():
+        return None
+    lease = Lease(WORKER_LEASE, store.path)
+    if not lease.try_acquire():
+        return None
+    try:
+        return migrate_store(store, lease)
+    finally:
+        lease.release()
+
+
+def _read_version(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _replace_atomically(path, write):
+    """Calls write(f) on a temp file next to path, then renames it over path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def migrate_file(path, lease=None, dry_run=False):
+    """
+    Brings a JSON array file of ideas (the legacy ideas.json format) to
+    latest_version(), streaming it element by element into a temp file that
+    then atomically replaces it. Returns {"from", "to", "scanned", "changed"}.
+    """
+    version_path = path + ".version"
+    version = _read_version(version_path)
+    result = {"from": version, "to": max(version, latest_version()), "scanned": 0, "changed": 0}
+    if version >= latest_version():
+        return result
+    keep_lease = LeaseKeeper(lease)
+
+    def write(out):
+        out.write("[")
+        with open(path, "r", encoding="utf-8") as f:
+            for n, idea in enumerate(iter_array(f)):
+                if isinstance(idea, dict) and apply_pending(idea, version):
+                    result["changed"] += 1
+                result["scanned"] += 1
+                # Same layout as json.dump(ideas, indent=2)
+                out.write(("," if n else "") + "\n" + textwrap.indent(json.dumps(idea, ensure_ascii=False, indent=2), "  "))
+                if n % BATCH_SIZE == 0:
+                    keep_lease()
+        out.write("\n]" if result["scanned"] else "]")
+
+    if dry_run:
+        with open(os.devnull, "w", encoding="utf-8") as devnull:
+            write(devnull)
+        return result
+    _replace_atomically(path, write)
+    _replace_atomically(version_path, lambda f: f.write(f"{result['to']}\n"))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Applies pending idea migrations.")
+    parser.add_argument("--file", help="migrate this JSON array file (e.g. ideas.json) instead of the store")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change, write nothing")
+    parser.add_argument("--wait", action="store_true", help="wait for the worker lease instead of giving up")
+    parser.add_argument("--list", action="store_true", help="list the migrations and the current version")
+    args = parser.parse_args()
+
+    store = IdeaStore()
+    current = _read_version(args.file + ".version") if args.file else int(store.meta(SCHEMA_VERSION_KEY, 0))
+    if args.list:
+        for number, name, migrate in MIGRATIONS:
+            print(f"{'*' if number > current else ' '} {number:3d} {name}: {(migrate.__doc__ or '').strip().splitlines()[0]}")
+        print(f"current version {current}, latest {latest_version()} (* = pending)")
+        sys.exit(0)
+
+    lease = Lease(WORKER_LEASE)
+    while not lease.try_acquire():
+        holder = (lease.current() or {}).get("holder")
+        if not args.wait:
+            sys.exit(f"The worker lease is held by {holder}; stop the worker or pass --wait.")
+        print(f"Waiting for the worker lease (held by {holder})...")
+        time.sleep(lease.ttl / 3)
+    try:
+        started = time.monotonic()
+        if args.file:
+            result = migrate_file(args.file, lease, args.dry_run)
+        else:
+            result = migrate_store(store, lease, dry_run=args.dry_run)
+        print(f"{'Would migrate' if args.dry_run else 'Migrated'} {args.file or store.path} from version "
+              f"{result['from']} to {result['to']}: {result['changed']} of {result['scanned']} ideas changed "
+              f"in {time.monotonic() - started:.1f}s.")
+    finally:
+        lease.release()
@@ -0,0 +1,92 @@
+import operator
+import re
+import unicodedata
+import zlib
+from array import array
+from itertools import repeat
+
+NUM_PERM = 64
+SHINGLE_SIZE = 3
+# Bumped whenever signatures are computed differently; the store recomputes
+# persisted ones that were made by another version
+SIGNATURE_VERSION = 2
+
+# Shingle hashes are 64 bits: the top 6 pick one of NUM_PERM bins, the other
+# 58 are the value a bin keeps the minimum of
+_BIN_SHIFT = 64 - (NUM_PERM - 1).bit_length()
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_MASK64 = (1 << 64) - 1
+# Odd 64-bit constant (2^64 / golden ratio): multiplying by it spreads a crc32 over all 64 bits
+_MIX = 0x9E3779B97F4A7C15
+_EMPTY = _MASK64
+# Whitespace and punctuation carry no content; dropping them keeps
+# "API連携、" and "API 連携" from shingling differently
+_NOISE_RE = re.compile(r"[\W_]+")
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """Set of character k-grams of the NFKC-folded, lower-cased text."""
+    text = _NOISE_RE.sub("", unicodedata.normalize("NFKC", str(text or "")).lower())
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def signature(text):
+    """
+    MinHash signature (NUM_PERM ints) of the text's shingles, by one
+    permutation hashing: each shingle hash falls into one bin and a bin keeps
+    its smallest value, so every shingle is hashed once instead of NUM_PERM
+    times. The hashing runs in map()/sorted()/dict() rather than a Python loop.
+    """
+    hashes = map(zlib.crc32, map(str.encode, shingles(text)))
+    hashes = sorted(map(operator.and_, map(operator.mul, hashes, repeat(_MIX)), repeat(_MASK64)), reverse=True)
+    if not hashes:
+        return [_EMPTY] * NUM_PERM
+    # Largest first, so the value a bin ends up with is its smallest
+    bins = dict(zip(map(operator.rshift, hashes, repeat(_BIN_SHIFT)), map(operator.and_, hashes, repeat(_VALUE_MASK))))
+    if len(bins) == NUM_PERM:
+        return [bins[i] for i in range(NUM_PERM)]
+    # Empty bins take the next filled bin's value, offset by the distance
+    # (rotation densification), so short texts stay comparable
+    sig = []
+    for i in range(NUM_PERM):
+        distance = next(d for d in range(NUM_PERM) if (i + d) % NUM_PERM in bins)
+        sig.append(bins[(i + distance) % NUM_PERM] + (distance << _BIN_SHIFT))
+    return sig
+
+
+def idea_signature(idea):
+    """What near-duplicate detection compares: title plus approach."""
+    return signature(f"{idea.get('title', '')} {idea.get('approach', '')}")
+
+
+def pack(sig):
+    return array("Q", sig).tobytes()
+
+
+def unpack(blob):
+    sig = array("Q")
+    sig.frombytes(blob)
+    return sig
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def lsh_params(threshold):
+    """
+    (bands, rows) splitting the signature for LSH. Picks the most selective
+    split whose candidate threshold (1/bands)^(1/rows) is still at or below
+    `threshold`, so pairs above it are very likely to share a bucket.
+    """
+    best = (NUM_PERM, 1)
+    for rows in range(1, NUM_PERM + 1):
+        if NUM_PERM % rows:
+            continue
+        bands = NUM_PERM // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
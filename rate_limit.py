@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled at `per_minute` tokens a minute, holding at
+    most `capacity` (default: one minute's worth). Waiters are served in
+    FIFO order. per_minute <= 0 means unlimited.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    async def acquire(self, amount=1):
+        if self.per_minute <= 0:
+            return
+        # A request bigger than the bucket would never fit; let it drain the
+        # bucket completely instead
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) * 60 / self.per_minute)
+                self._refill()
+            self._tokens -= amount
+
+    def adjust(self, amount):
+        """
+        Corrects an estimate after the fact: positive amounts take more
+        tokens (the bucket may go negative and delay later callers), negative
+        ones give tokens back.
+        """
+        if self.per_minute <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, as one acquire()."""
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, estimated_tokens):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Charges the difference once the response reports its real usage."""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
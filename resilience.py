@@ -0,0 +1,184 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+
+# HTTP statuses worth another try: timeouts, throttling and server faults
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream the breaker considers unhealthy."""
+
+
+def is_retryable(exc):
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, json.JSONDecodeError)):
+        return True
+    # google-genai's APIError carries the HTTP status as .code
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    if code in RETRYABLE_STATUS:
+        return True
+    # Transport errors of the HTTP clients the SDK may use
+    return type(exc).__module__.split(".")[0] in ("httpx", "aiohttp")
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and stays open
+    for `reset_seconds`; then lets a single probe through (half-open), which
+    closes it again on success or re-opens it on failure.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opens = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe = None
+
+    @property
+    def state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probe = None
+        return self._state
+
+    def allow(self):
+        """
+        Falsy if the call must not go ahead. While half-open, the single call
+        let through gets a probe token: pass it to release() if that call
+        ends without recording a success or a failure.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probe is None:
+            self._probe = object()
+            return self._probe
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probe = None
+
+    def release(self, token):
+        """Gives back the probe if `token` (from allow()) still holds it, e.g. after a cancelled call."""
+        if token is self._probe:
+            self._probe = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opens += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe = None
+
+
+class ResilientCaller:
+    """
+    Runs an async call with a per-attempt deadline, full-jitter exponential
+    backoff between retries of retryable errors, a CircuitBreaker in front
+    and, if `hedge` is set, a second concurrent attempt once the first has
+    taken longer than the recent p95 latency (first success wins).
+    """
+
+    def __init__(self, timeout=60, retries=3, backoff_base=1.0, backoff_cap=20.0, breaker=None,
+                 hedge=False, hedge_min_samples=20):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=200)
+        self.counts = Counter()
+
+    def p95(self):
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    async def call(self, attempt, hedge=None):
+        """
+        Awaits attempt() (a coroutine function) under the policy above;
+        hedge=False turns hedging off for this call.
+        """
+        admitted = self.breaker.allow()
+        if not admitted:
+            self.counts["short_circuited"] += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self.counts["calls"] += 1
+        try:
+            for n in range(self.retries + 1):
+                try:
+                    result = await self._hedged(attempt, self.hedge if hedge is None else hedge)
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.counts["timeouts"] += 1
+                    if not is_retryable(e):
+                        # The upstream answered; the request itself was bad
+                        self.breaker.record_success()
+                        self.counts["failures"] += 1
+                        raise
+                    if n == self.retries:
+                        self.breaker.record_failure()
+                        self.counts["failures"] += 1
+                        raise
+                    self.counts["retries"] += 1
+                    await asyncio.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** n)))
+                else:
+                    self.breaker.record_success()
+                    return result
+        except BaseException:
+            # Cancelled mid-probe: otherwise a half-open breaker would wait
+            # forever for its outcome. A no-op unless this call is the probe
+            # and recorded nothing.
+            self.breaker.release(admitted)
+            raise
+
+    async def _hedged(self, attempt, hedge):
+        started = time.monotonic()
+        first = asyncio.ensure_future(asyncio.wait_for(attempt(), self.timeout))
+        tasks = [first]
+        try:
+            delay = self.p95() if hedge else None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.counts["hedges"] += 1
+                    tasks.append(asyncio.ensure_future(asyncio.wait_for(attempt(), self.timeout)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.counts["hedge_wins"] += 1
+                        self.latencies.append(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "consecutive_failures": self.breaker.failures,
+            "p95_seconds": self.p95(),
+            **{k: self.counts[k] for k in ("calls", "retries", "timeouts", "failures", "short_circuited", "hedges", "hedge_wins")},
+        }
@@ -0,0 +1,316 @@
+import asyncio
+import heapq
+import math
+import random
+import threading
+
+from idea_store import get_store
+
+
+class IndexedHeap:
+    """
+    Binary min-heap of (key, id) with an id -> position map, so an entry can
+    be updated or removed by id in O(log n) instead of rebuilding the heap.
+    """
+
+    def __init__(self):
+        self._heap = []  # [(key, id)]
+        self._pos = {}  # id -> index in _heap
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, item_id):
+        return item_id in self._pos
+
+    def push(self, item_id, key):
+        """Inserts item_id, or moves it if it is already in the heap."""
+        if item_id in self._pos:
+            i = self._pos[item_id]
+            old = self._heap[i][0]
+            self._heap[i] = (key, item_id)
+            if key < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+            return
+        self._heap.append((key, item_id))
+        self._pos[item_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def remove(self, item_id):
+        i = self._pos.pop(item_id, None)
+        if i is None:
+            return
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._pos[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self._pos[last[1]])
+
+    def smallest(self):
+        """
+        Generator of (key, id) in ascending order without modifying the heap:
+        taking the first k costs O(k log k), whatever the heap size.
+        """
+        if not self._heap:
+            return
+        frontier = [(self._heap[0], 0)]
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            yield entry
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+
+    def _swap(self, i, j):
+        self._heap[i], self._heap[j] = self._heap[j], self._heap[i]
+        self._pos[self._heap[i][1]] = i
+        self._pos[self._heap[j][1]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._heap[i] < self._heap[parent]:
+                self._swap(i, parent)
+                i = parent
+            else:
+                break
+
+    def _sift_down(self, i):
+        n = len(self._heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._heap[child] < self._heap[smallest]:
+                    smallest = child
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
+
+
+def _score(idea):
+    try:
+        return int(idea.get("recommendation_score", 3))
+    except (TypeError, ValueError):
+        return 3
+
+
+class IdeaQueues:
+    """
+    Priority queues the worker picks its next action from, kept current by
+    replaying the store's changes feed (O(log n) per changed idea):
+
+    - by_updated: finished ideas, oldest updated_at first (review order)
+    - by_priority: finished ideas, lowest (score, updated_at) first (eviction order)
+    - drafts: drafts, oldest first (abandoned-draft cleanup)
+
+    plus title -> ids for the exact-title duplicate check.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.revision = self.store.revision()
+        self.by_updated = IndexedHeap()
+        self.by_priority = IndexedHeap()
+        self.drafts = IndexedHeap()
+        self._titles = {}  # title -> {id: updated_at}
+        self._entries = {}  # id -> title (finished ideas)
+        self._duplicate_titles = set()
+        for idea in self.store.all():
+            self._add(idea)
+
+    def _add(self, idea):
+        idea_id = idea["id"]
+        updated_at = str(idea.get("updated_at", ""))
+        if idea.get("draft"):
+            self.drafts.push(idea_id, updated_at)
+            return
+        title = str(idea.get("title", ""))
+        self.by_updated.push(idea_id, updated_at)
+        self.by_priority.push(idea_id, (_score(idea), updated_at))
+        self._entries[idea_id] = title
+        ids = self._titles.setdefault(title, {})
+        ids[idea_id] = updated_at
+        if len(ids) > 1:
+            self._duplicate_titles.add(title)
+
+    def _remove(self, idea_id):
+        self.drafts.remove(idea_id)
+        title = self._entries.pop(idea_id, None)
+        if title is None:
+            return
+        self.by_updated.remove(idea_id)
+        self.by_priority.remove(idea_id)
+        ids = self._titles[title]
+        ids.pop(idea_id, None)
+        if len(ids) < 2:
+            self._duplicate_titles.discard(title)
+        if not ids:
+            del self._titles[title]
+
+    def refresh(self):
+        """Applies store changes since the last refresh."""
+        if self.store.revision() == self.revision:
+            return
+        with self._lock:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self._rebuild()
+                return
+            for idea_id in delta["removed"]:
+                self._remove(idea_id)
+            for idea in delta["changed"]:
+                self._remove(idea["id"])
+                self._add(idea)
+            self.revision = delta["revision"]
+
+    def count(self):
+        """Number of finished ideas."""
+        self.refresh()
+        return len(self.by_updated)
+
+    def oldest(self, k, exclude=()):
+        """Ids of the k least recently updated finished ideas not in exclude."""
+        self.refresh()
+        with self._lock:
+            ids = []
+            for _, idea_id in self.by_updated.smallest():
+                if len(ids) >= k:
+                    break
+                if idea_id not in exclude:
+                    ids.append(idea_id)
+            return ids
+
+    def lowest_priority(self):
+        """Id of the eviction victim (lowest score, oldest first), or None."""
+        self.refresh()
+        with self._lock:
+            for _, idea_id in self.by_priority.smallest():
+                return idea_id
+            return None
+
+    def below_score(self, min_score):
+        """Ids of finished ideas scored below min_score."""
+        self.refresh()
+        with self._lock:
+            ids = []
+            for (score, _), idea_id in self.by_priority.smallest():
+                if score >= min_score:
+                    break
+                ids.append(idea_id)
+            return ids
+
+    def drafts_before(self, cutoff):
+        """Ids of drafts last updated before cutoff (an ISO timestamp)."""
+        self.refresh()
+        with self._lock:
+            ids = []
+            for updated_at, idea_id in self.drafts.smallest():
+                if updated_at >= cutoff:
+                    break
+                ids.append(idea_id)
+            return ids
+
+    def title_duplicates(self):
+        """Ids sharing a title with a newer idea (the newest of each title is kept)."""
+        self.refresh()
+        with self._lock:
+            ids = []
+            for title in self._duplicate_titles:
+                by_age = sorted(self._titles[title].items(), key=lambda x: (x[1], x[0]), reverse=True)
+                ids.extend(idea_id for idea_id, _ in by_age[1:])
+            return ids
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel for the worker's sleeps. A sleeper is filed into the
+    slot of its deadline tick (O(1), however many are waiting) and a single
+    driver task wakes once per tick to release that slot, instead of every
+    actor keeping its own timer.
+    """
+
+    def __init__(self, tick=0.25, slots=512):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self._pending = 0
+        self._current = None  # last tick processed
+        self._driver = None
+
+    async def sleep_until(self, deadline):
+        """Sleeps until loop time `deadline` (to the next tick)."""
+        loop = asyncio.get_running_loop()
+        if deadline <= loop.time():
+            await asyncio.sleep(0)
+            return
+        future = loop.create_future()
+        tick = math.ceil(deadline / self.tick)
+        if self._current is None:
+            self._current = math.floor(loop.time() / self.tick)
+        tick = max(tick, self._current + 1)
+        self.slots[tick % len(self.slots)].append((tick, future))
+        self._pending += 1
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.ensure_future(self._drive())
+        await future
+
+    async def _drive(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await asyncio.sleep(max(0.0, (self._current + 1) * self.tick - loop.time()))
+            now_tick = math.floor(loop.time() / self.tick)
+            # After a stall, catch up on every tick missed (one lap at most)
+            for tick in range(self._current + 1, min(now_tick, self._current + len(self.slots)) + 1):
+                slot = self.slots[tick % len(self.slots)]
+                due = [entry for entry in slot if entry[0] <= now_tick]
+                if not due:
+                    continue
+                slot[:] = [entry for entry in slot if entry[0] > now_tick]
+                for _, future in due:
+                    self._pending -= 1
+                    if not future.done():
+                        future.set_result(None)
+            self._current = max(self._current, now_tick)
+
+
+class Pacer:
+    """
+    Deadline-based pacing of one actor: each action is due `interval` after
+    the previous deadline (not after the previous action finished), so slow
+    actions do not stretch the schedule; an actor that fell behind by more
+    than one interval starts over from now.
+    """
+
+    def __init__(self, wheel, interval):
+        self.wheel = wheel
+        self.interval = interval
+        self.deadline = None
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        low, high = self.interval
+        if self.deadline is None or self.deadline < now - high:
+            self.deadline = now
+        self.deadline += random.uniform(low, high)
+        await self.wheel.sleep_until(self.deadline)
+
+
+_queues = None
+_queues_lock = threading.Lock()
+
+
+def get_idea_queues():
+    """Process-wide IdeaQueues over get_store()."""
+    global _queues
+    if _queues is None:
+        with _queues_lock:
+            if _queues is None:
+                _queues = IdeaQueues(get_store())
+    return _queues
@@ -0,0 +1,200 @@
+import html
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+from idea_store import get_store
+
+# Searchable fields and how many times each one's terms are counted
+SEARCH_FIELDS = {"title": 3, "approach": 1, "rationale": 1, "review_comment": 1}
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_RADIUS = 40
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    # NFKC folds full-width alphanumerics and half-width kana, so 'ＡＰＩ',
+    # 'API' and 'api' all index the same
+    return unicodedata.normalize("NFKC", str(text or "")).lower()
+
+
+def ngrams(text):
+    """
+    Character bigrams of every word run. Japanese is not whitespace
+    segmented, so overlapping bigrams stand in for words; one-character runs
+    are kept as unigrams.
+    """
+    terms = []
+    for run in _WORD_RE.findall(normalize(text)):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class SearchIndex:
+    """
+    Incremental n-gram inverted index with BM25 ranking. Like IdeaIndex it
+    replays the store's changes feed, so an insert or update by the worker
+    only re-indexes that one idea.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.revision = self.store.revision()
+        self._postings = defaultdict(dict)  # term -> {id: tf}
+        self._doc_terms = {}  # id -> Counter of terms (for removal)
+        self._doc_lengths = {}
+        self._total_length = 0
+        for idea in self.store.all():
+            self._add(idea)
+
+    def _add(self, idea):
+        terms = Counter()
+        for field, weight in SEARCH_FIELDS.items():
+            for term in ngrams(idea.get(field)):
+                terms[term] += weight
+        idea_id = idea["id"]
+        for term, tf in terms.items():
+            self._postings[term][idea_id] = tf
+        self._doc_terms[idea_id] = terms
+        self._doc_lengths[idea_id] = sum(terms.values())
+        self._total_length += self._doc_lengths[idea_id]
+
+    def _remove(self, idea_id):
+        terms = self._doc_terms.pop(idea_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(idea_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(idea_id)
+
+    def refresh(self):
+        """Applies store changes since the last refresh."""
+        if self.store.revision() == self.revision:
+            return
+        with self._lock:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self._rebuild()
+                return
+            for idea_id in delta["removed"]:
+                self._remove(idea_id)
+            for idea in delta["changed"]:
+                self._remove(idea["id"])
+                self._add(idea)
+            self.revision = delta["revision"]
+
+    def search(self, query, limit=20):
+        """
+        [(id, score)] of ideas containing every n-gram of the query, best
+        BM25 score first (all of them if limit is None).
+        """
+        terms = list(dict.fromkeys(ngrams(query)))
+        if not terms:
+            return []
+        self.refresh()
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if n_docs == 0:
+                return []
+            postings = [self._postings.get(t) if len(t) > 1 else self._char_postings(t) for t in terms]
+            if not all(postings):
+                return []
+            # Rarest term first keeps the intersection small
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for p in postings[1:]:
+                candidates &= p.keys()
+                if not candidates:
+                    return []
+
+            avg_length = self._total_length / n_docs
+            scores = {}
+            for p in postings:
+                idf = math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5))
+                for idea_id in candidates:
+                    tf = p[idea_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[idea_id] / avg_length)
+                    scores[idea_id] = scores.get(idea_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:limit]
+
+    def _char_postings(self, char):
+        # Single-character queries: merge the postings of the unigram and of
+        # every bigram that contains the character (a vocabulary scan, but
+        # only for 1-char terms)
+        merged = {}
+        for term, postings in self._postings.items():
+            if char in term:
+                for idea_id, tf in postings.items():
+                    merged[idea_id] = merged.get(idea_id, 0) + tf
+        return merged
+
+
+def snippet(idea, query, radius=SNIPPET_RADIUS):
+    """
+    HTML-escaped excerpt around the first match of the query (or, failing
+    that, of any of its n-grams), with matches wrapped in <mark>.
+    """
+    needles = [normalize(query).strip()] + list(dict.fromkeys(ngrams(query)))
+    needles = [n for n in needles if n]
+    for field in SEARCH_FIELDS:
+        text = unicodedata.normalize("NFKC", str(idea.get(field) or ""))
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = text
+        for needle in needles:
+            pos = lowered.find(needle)
+            if pos < 0:
+                continue
+            start = max(0, pos - radius)
+            end = min(len(text), pos + len(needle) + radius)
+            return _highlight(text[start:end], lowered[start:end], needles, start > 0, end < len(text))
+    return ""
+
+
+def _highlight(text, lowered, needles, cut_left, cut_right):
+    marked = [False] * len(text)
+    for needle in needles:
+        pos = lowered.find(needle)
+        while pos >= 0:
+            for i in range(pos, pos + len(needle)):
+                marked[i] = True
+            pos = lowered.find(needle, pos + 1)
+    out = []
+    i = 0
+    while i < len(text):
+        j = i
+        while j < len(text) and marked[j] == marked[i]:
+            j += 1
+        chunk = html.escape(text[i:j]).replace("\n", " ")
+        out.append(f"<mark>{chunk}</mark>" if marked[i] else chunk)
+        i = j
+    return ("…" if cut_left else "") + "".join(out) + ("…" if cut_right else "")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Process-wide SearchIndex over get_store()."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex(get_store())
+    return _index
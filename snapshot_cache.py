@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# version: whatever the source reports as its current state (stat tuple, revision, ...)
+# data:    the parsed, pre-sorted value
+# body:    data pre-serialized as a JSON response body
+# etag:    content hash of body (without quotes)
+# gzip/br: body precompressed with gzip / brotli (br is None if brotli is not installed)
+Snapshot = namedtuple("Snapshot", ["version", "data", "body", "etag", "gzip", "br"])
+
+
+def dump_json(data):
+    # Same encoding as starlette's JSONResponse
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def build_snapshot(version, data):
+    body = dump_json(data)
+    return Snapshot(
+        version=version,
+        data=data,
+        body=body,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        br=brotli.compress(body, quality=9) if brotli else None,
+    )
+
+
+class SnapshotCache:
+    """
+    Process-wide cache of an immutable Snapshot, rebuilt only when the
+    source's version changes.
+
+    Readers grab the current snapshot with a single attribute read and never
+    take the lock unless it is stale; the rebuilt snapshot is swapped in as a
+    whole, so concurrent requests never observe a half-built one.
+    """
+
+    def __init__(self, version_fn, load_fn):
+        self._version_fn = version_fn
+        self._load_fn = load_fn
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self):
+        version = self._version_fn()
+        snap = self._snapshot
+        if snap is not None and snap.version == version:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and snap.version == version:
+                return snap
+            snap = build_snapshot(version, self._load_fn())
+            self._snapshot = snap
+            return snap
+
+    def invalidate(self):
+        self._snapshot = None
@@ -1,10 +1,17 @@
 document.addEventListener('DOMContentLoaded', () => {
-    let lastFetchedTimestamp = '';
+    let lastRevision = null;
     let pollingInterval = null;
+    let eventsInterval = null;
     let highlightInterval = null;
 
     const API_IDEAS = '/api/ideas';
-    const API_UPDATE_CHECK = '/api/check_updates';
+    const API_CHANGES = '/api/ideas/changes';
+    const API_STREAM = '/api/stream';
+    const API_SEARCH = '/api/search';
+    const SEARCH_LIMIT = 100;
+    const SEARCH_DEBOUNCE_MS = 250;
+    const FIRST_PAGE_SIZE = 24; // First paint stays flat however big the corpus is
+    const PAGE_SIZE = 200;
     const UPDATE_THRESHOLD_MS = 10 * 60 * 1000; // 10 minutes
 
     const banner = document.getElementById('update-banner');
@@ -12,14 +19,21 @@ document.addEventListener('DOMContentLoaded', () => {
     const ideasGrid = document.getElementById('ideas-grid');
     const totalCountEl = document.getElementById('total-ideas');
 
-    let currentIdeas = []; // Global storage for filtering
+    let currentIdeas = []; // Global storage for filtering (summary fields only)
+    const ideaDetails = new Map(); // id -> full idea, filled when a card is expanded
 
     // Make it globally accessible for the onclick in HTML
     window.fetchAndRenderIdeas = fetchAndRenderIdeas;
-    window.toggleDetails = function (btn) {
+    window.toggleDetails = async function (btn) {
         const details = btn.nextElementSibling;
         if (details.style.display === 'none') {
             details.style.display = 'block';
+            if (!details.dataset.loaded) {
+                details.innerHTML = '<p>読み込み中...</p>';
+                const idea = await loadIdeaDetail(details.dataset.ideaId);
+                details.innerHTML = idea ? renderDetailsHtml(idea) : '<p>詳細を取得できませんでした</p>';
+                if (idea) details.dataset.loaded = '1';
+            }
             btn.innerHTML = '詳細を閉じる <i class="fas fa-chevron-up"></i>';
         } else {
             details.style.display = 'none';
@@ -27,30 +41,63 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    async function loadIdeaDetail(id) {
+        if (ideaDetails.has(id)) return ideaDetails.get(id);
+        try {
+            const res = await fetch(`${API_IDEAS}/${encodeURIComponent(id)}`);
+            if (!res.ok) return null;
+            const idea = await res.json();
+            ideaDetails.set(id, idea);
+            return idea;
+        } catch (e) {
+            console.error("Failed to fetch idea detail", e);
+            return null;
+        }
+    }
+
+    function renderIdeas() {
+        if (currentIdeas.length > 0) {
+            // Hide loading
+            loading.classList.add('hidden');
+            totalCountEl.textContent = currentIdeas.length;
+
+            populateFilters();
+            renderFilteredGrid();
+        } else {
+            loading.innerHTML = "<p>まだアイディアがありません。AIが考案中です...</p>";
+            totalCountEl.textContent = "0";
+        }
+    }
+
     async function fetchAndRenderIdeas() {
         try {
-            const reqTime = new Date().getTime();
-            const res = await fetch(API_IDEAS);
-            currentIdeas = await res.json(); // Store globally
+            // First page of summaries is painted right away, the rest follows
+            const res = await fetch(`${API_IDEAS}?fields=summary&limit=${FIRST_PAGE_SIZE}`);
+            // Changes after this revision reach us through the stream / changes feed
+            lastRevision = res.headers.get('X-Revision');
+            let cursor = res.headers.get('X-Next-Cursor');
 
             // Hide banner since we are updating
             banner.classList.remove('visible');
             setTimeout(() => { if (!banner.classList.contains('visible')) banner.style.display = 'none'; }, 400);
 
-            if (currentIdeas.length > 0) {
-                // Determine the highest updated_at to save as our last known
-                lastFetchedTimestamp = currentIdeas[0].updated_at; // since it's sorted desc from backend
-
-                // Hide loading
-                loading.classList.add('hidden');
-                totalCountEl.textContent = currentIdeas.length;
-
-                populateFilters(currentIdeas);
-                renderFilteredGrid();
-            } else {
-                loading.innerHTML = "<p>まだアイディアがありません。AIが考案中です...</p>";
-                totalCountEl.textContent = "0";
+            currentIdeas = await res.json(); // Store globally
+            ideaDetails.clear();
+            renderIdeas();
+
+            if (!cursor) return;
+            const seen = new Set(currentIdeas.map(idea => idea.id));
+            while (cursor) {
+                const pageRes = await fetch(`${API_IDEAS}?fields=summary&limit=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`);
+                cursor = pageRes.headers.get('X-Next-Cursor');
+                (await pageRes.json()).forEach(idea => {
+                    if (!seen.has(idea.id)) {
+                        seen.add(idea.id);
+                        currentIdeas.push(idea);
+                    }
+                });
             }
+            renderIdeas();
         } catch (e) {
             console.error("Failed to fetch ideas", e);
         }
@@ -62,26 +109,71 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('filter-audience')?.addEventListener('change', renderFilteredGrid);
     document.getElementById('sort-score')?.addEventListener('change', renderFilteredGrid);
 
-    function renderFilteredGrid() {
+    // Keyword search waits for a pause in typing before asking the server
+    let searchTimer = null;
+    document.getElementById('search-box')?.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(renderFilteredGrid, SEARCH_DEBOUNCE_MS);
+    });
+
+    let filterRequest = 0;
+
+    async function renderFilteredGrid() {
         const targetFilter = document.getElementById('filter-target')?.value || 'all';
         const moduleFilter = document.getElementById('filter-module')?.value || 'all';
         const audienceFilter = document.getElementById('filter-audience')?.value || 'all';
         const sortOrder = document.getElementById('sort-score')?.value || 'default';
+        const query = (document.getElementById('search-box')?.value || '').trim();
+
+        const params = new URLSearchParams({ fields: 'summary' });
+        if (targetFilter !== 'all') params.set('target', targetFilter);
+        if (moduleFilter !== 'all') params.set('module', moduleFilter);
+        if (audienceFilter !== 'all') params.set('audience', audienceFilter);
+
+        // Keyword search: results come back ranked, with highlighted snippets
+        if (query) {
+            const request = ++filterRequest;
+            params.delete('fields');
+            params.set('q', query);
+            params.set('limit', SEARCH_LIMIT);
+            try {
+                const res = await fetch(`${API_SEARCH}?${params}`);
+                const data = await res.json();
+                if (request !== filterRequest) return;
+                renderGrid((data.results || []).map(r => ({ ...r.idea, _snippet: r.snippet })));
+            } catch (e) {
+                console.error("Failed to search ideas", e);
+            }
+            return;
+        }
 
-        let filtered = currentIdeas.filter(idea => {
-            let matchTarget = targetFilter === 'all' || idea.target === targetFilter;
-            let matchModule = moduleFilter === 'all' || (idea.modules && idea.modules.includes(moduleFilter));
-            let matchAudience = audienceFilter === 'all' || (idea.target_audience && idea.target_audience.includes(audienceFilter));
-            return matchTarget && matchModule && matchAudience;
-        });
+        if (sortOrder !== 'default') params.set('sort', sortOrder);
 
-        if (sortOrder === 'desc') {
-            filtered.sort((a, b) => (b.recommendation_score || 0) - (a.recommendation_score || 0));
-        } else if (sortOrder === 'asc') {
-            filtered.sort((a, b) => (a.recommendation_score || 0) - (b.recommendation_score || 0));
+        // No filter: currentIdeas is already newest first
+        if (targetFilter === 'all' && moduleFilter === 'all' && audienceFilter === 'all' && sortOrder === 'default') {
+            filterRequest++;
+            renderGrid(currentIdeas);
+            return;
         }
 
-        renderGrid(filtered);
+        // Filtering and sorting are answered by the server's inverted indexes
+        const request = ++filterRequest;
+        try {
+            let filtered = [];
+            let cursor = null;
+            do {
+                const pageParams = new URLSearchParams(params);
+                if (cursor) pageParams.set('cursor', cursor);
+                const res = await fetch(`${API_IDEAS}?${pageParams}`);
+                cursor = res.headers.get('X-Next-Cursor');
+                filtered = filtered.concat(await res.json());
+            } while (cursor && request === filterRequest);
+            // A newer filter change has superseded this one
+            if (request !== filterRequest) return;
+            renderGrid(filtered);
+        } catch (e) {
+            console.error("Failed to fetch filtered ideas", e);
+        }
     }
 
     function renderGrid(ideas) {
@@ -93,158 +185,22 @@ document.addEventListener('DOMContentLoaded', () => {
             const isRecent = (now - updatedAt) <= UPDATE_THRESHOLD_MS;
 
             const card = document.createElement('div');
-            card.className = `card ${isRecent ? 'recently-updated' : ''}`;
+            card.className = `card ${isRecent ? 'recently-updated' : ''} ${idea.draft ? 'draft' : ''}`;
             card.setAttribute('data-updated-at', idea.updated_at);
 
             const timeStr = new Date(idea.updated_at).toLocaleString('ja-JP', {
                 month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit'
             });
 
-            let scheduleHtml = '';
-            let s = null;
-            if (idea.schedule) {
-                if (Array.isArray(idea.schedule)) {
-                    s = {
-                        durations: idea.schedule.length,
-                        tracks: [
-                            { name: "全体スケジュール", items: [] },
-                            { name: "ベンダー（導入）", items: [] },
-                            { name: "企業側(人事・情シス)", items: [] }
-                        ],
-                        tasks: []
-                    };
-                    idea.schedule.forEach((phase, i) => {
-                        const m = i + 1;
-                        const phaseName = phase.phase || phase.month || `Phase ${m}`;
-
-                        s.tracks[0].items.push({ name: phaseName, start: m, end: m });
-
-                        let vendorTasks = [];
-                        let clientTasks = [];
-
-                        if (phase.tasks && Array.isArray(phase.tasks)) {
-                            phase.tasks.forEach(t => {
-                                let actor = t.actor || '';
-                                if (!actor && t.raci) {
-                                    const raciStr = t.raci;
-                                    const vMatch = raciStr.match(/V:\s*([A-Za-z,]+)/);
-                                    const cMatch = raciStr.match(/C:\s*([A-Za-z,]+)/);
-                                    const vAr = vMatch && (vMatch[1].includes('A') || vMatch[1].includes('R'));
-                                    const cAr = cMatch && (cMatch[1].includes('A') || cMatch[1].includes('R'));
-
-                                    if (vAr && cAr) actor = '全体';
-                                    else if (vAr) actor = 'ベンダー';
-                                    else if (cAr) actor = '顧客';
-                                    else actor = '全体';
-                                }
-
-                                s.tasks.push({ ...t, phase: phaseName, actor: actor });
-
-                                if (actor === 'ベンダー') vendorTasks.push(t.name);
-                                else if (actor === '顧客') clientTasks.push(t.name);
-                            });
-                        }
-
-                        if (vendorTasks.length > 0) {
-                            s.tracks[1].items.push({ name: vendorTasks.join(' / '), start: m, end: m });
-                        }
-                        if (clientTasks.length > 0) {
-                            s.tracks[2].items.push({ name: clientTasks.join(' / '), start: m, end: m });
-                        }
-                    });
-                } else if (idea.schedule.tracks) {
-                    s = idea.schedule;
-                }
-            }
-
-            if (s && s.tracks) {
-                const durations = s.durations || 3;
-
-                // Header
-                let ganttHtml = `<div class="gantt-chart" style="--total-months: ${durations};">`;
-                ganttHtml += `<div class="gantt-header-label" style="grid-row: 1; grid-column: 1 / 2;">担当 / フェーズ</div>`;
-                for (let i = 1; i <= durations; i++) {
-                    ganttHtml += `<div class="gantt-header-cell" style="grid-row: 1; grid-column: ${i + 1} / ${i + 2};">Month ${i}</div>`;
-                }
-
-                s.tracks.forEach((track, idx) => {
-                    const row = idx + 2;
-                    ganttHtml += `<div class="gantt-track-label" style="grid-row: ${row}; grid-column: 1 / 2;">${track.name}</div>`;
-
-                    for (let i = 1; i <= durations; i++) {
-                        ganttHtml += `<div class="gantt-bg-cell" style="grid-row: ${row}; grid-column: ${i + 1} / ${i + 2};"></div>`;
-                    }
-
-                    // Track Items (Chevron blocks)
-                    track.items.forEach(item => {
-                        let classStr = "gantt-bar";
-                        if (idx === 0) classStr += " gantt-bar-overall";
-                        else if (idx === 1) classStr += " gantt-bar-vendor";
-                        else classStr += " gantt-bar-client";
-
-                        // item.start is 1-indexed (Month 1 => start column 2)
-                        // item.end is 1-indexed (end at Month 2 => end column 4)
-                        const gridColStart = item.start + 1;
-                        const gridColEnd = item.end + 2;
-
-                        ganttHtml += `<div class="${classStr}" style="grid-row: ${row}; grid-column: ${gridColStart} / ${gridColEnd};" title="${item.name}"><span>${item.name}</span></div>`;
-                    });
-                });
-                ganttHtml += `</div>`;
-
-                // --- Task Detail Table ---
-                let tasksHtml = '';
-                (s.tasks || []).forEach(t => {
-                    let actorBadgeClass = 'target'; // Default background (green)
-                    if (t.actor === 'ベンダー') actorBadgeClass = 'vendor';
-                    else if (t.actor === '全体') actorBadgeClass = 'overall';
-
-                    tasksHtml += `
-                        <tr>
-                            <td><span class="task-actor-badge ${actorBadgeClass}">${t.actor || ''}</span></td>
-                            <td>${t.phase || ''}</td>
-                            <td>${t.name}</td>
-                            <td>${t.duration}</td>
-                            <td>${t.dependency}</td>
-                        </tr>
-                    `;
-                });
-
-                const taskTableHtml = `
-                    <div class="table-responsive">
-                        <table class="bordered-table">
-                            <thead>
-                                <tr>
-                                    <th>担当 (Actor)</th>
-                                    <th>フェーズ (Phase)</th>
-                                    <th>タスク (Task)</th>
-                                    <th>期間 (Duration)</th>
-                                    <th>依存関係 (Dependency)</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                ${tasksHtml}
-                            </tbody>
-                        </table>
-                    </div>
-                `;
-
-                scheduleHtml = `
-                    <div class="schedule-section">
-                        <h4>IMPLEMENTATION SCHEDULE (導入スケジュール)</h4>
-                        ${ganttHtml}
-                        ${taskTableHtml}
-                    </div>
-                `;
-            }
-
             card.innerHTML = `
                 <div class="update-label">10分以内の更新</div>
                 <div class="card-header">
                     <span class="persona-badge">${idea.persona}</span>
+                    ${idea.draft ? '<span class="draft-badge"><i class="fas fa-pen"></i> 生成中 (ドラフト)</span>' : ''}
                     <span class="cost-badge">${idea.cost || 'コスト未定'}</span>
                 </div>
                 <h3 class="card-title">${idea.title}</h3>
+                ${idea._snippet ? `<div class="search-snippet">${idea._snippet}</div>` : ''}
                 <div class="card-content">
                     <div class="attribute-row">
                         <span class="attr-label">ターゲット (Target)</span>
@@ -291,13 +247,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     
                     <button class="toggle-details" onclick="toggleDetails(this)">詳細を見る <i class="fas fa-chevron-down"></i></button>
                     
-                    <div class="card-details" style="display: none;">
-                        <h4>APPROACH (アプローチ)</h4>
-                        <p>${(idea.approach || '').replace(/\n/g, '<br>')}</p>
-                        <h4>RATIONALE (根拠)</h4>
-                        <p>${(idea.rationale || '').replace(/\n/g, '<br>')}</p>
-                        ${scheduleHtml}
-                    </div>
+                    <div class="card-details" data-idea-id="${idea.id}" style="display: none;"></div>
                 </div>
                 <div class="card-footer">
                     <span>最終更新: ${timeStr}</span>
@@ -307,23 +257,202 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    async function checkForUpdates() {
-        if (!lastFetchedTimestamp) return;
+    // Approach, rationale and schedule: only rendered once a card is expanded
+    function renderDetailsHtml(idea) {
+        let scheduleHtml = '';
+        // Stored in one canonical shape (tracks of month bars plus tasks with
+        // their actor), normalized by the server when the idea was written
+        const s = idea.schedule;
+
+        if (s && s.tracks) {
+            const durations = s.durations || 3;
+
+            // Header
+            let ganttHtml = `<div class="gantt-chart" style="--total-months: ${durations};">`;
+            ganttHtml += `<div class="gantt-header-label" style="grid-row: 1; grid-column: 1 / 2;">担当 / フェーズ</div>`;
+            for (let i = 1; i <= durations; i++) {
+                ganttHtml += `<div class="gantt-header-cell" style="grid-row: 1; grid-column: ${i + 1} / ${i + 2};">Month ${i}</div>`;
+            }
+
+            s.tracks.forEach((track, idx) => {
+                const row = idx + 2;
+                ganttHtml += `<div class="gantt-track-label" style="grid-row: ${row}; grid-column: 1 / 2;">${track.name}</div>`;
+
+                for (let i = 1; i <= durations; i++) {
+                    ganttHtml += `<div class="gantt-bg-cell" style="grid-row: ${row}; grid-column: ${i + 1} / ${i + 2};"></div>`;
+                }
+
+                // Track Items (Chevron blocks)
+                track.items.forEach(item => {
+                    let classStr = "gantt-bar";
+                    if (idx === 0) classStr += " gantt-bar-overall";
+                    else if (idx === 1) classStr += " gantt-bar-vendor";
+                    else classStr += " gantt-bar-client";
+
+                    // item.start is 1-indexed (Month 1 => start column 2)
+                    // item.end is 1-indexed (end at Month 2 => end column 4)
+                    const gridColStart = item.start + 1;
+                    const gridColEnd = item.end + 2;
+
+                    ganttHtml += `<div class="${classStr}" style="grid-row: ${row}; grid-column: ${gridColStart} / ${gridColEnd};" title="${item.name}"><span>${item.name}</span></div>`;
+                });
+            });
+            ganttHtml += `</div>`;
+
+            // --- Task Detail Table ---
+            let tasksHtml = '';
+            (s.tasks || []).forEach(t => {
+                let actorBadgeClass = 'target'; // Default background (green)
+                if (t.actor === 'ベンダー') actorBadgeClass = 'vendor';
+                else if (t.actor === '全体') actorBadgeClass = 'overall';
+
+                tasksHtml += `
+                    <tr>
+                        <td><span class="task-actor-badge ${actorBadgeClass}">${t.actor || ''}</span></td>
+                        <td>${t.phase || ''}</td>
+                        <td>${t.name}</td>
+                        <td>${t.duration}</td>
+                        <td>${t.dependency}</td>
+                    </tr>
+                `;
+            });
+
+            const taskTableHtml = `
+                <div class="table-responsive">
+                    <table class="bordered-table">
+                        <thead>
+                            <tr>
+                                <th>担当 (Actor)</th>
+                                <th>フェーズ (Phase)</th>
+                                <th>タスク (Task)</th>
+                                <th>期間 (Duration)</th>
+                                <th>依存関係 (Dependency)</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            ${tasksHtml}
+                        </tbody>
+                    </table>
+                </div>
+            `;
+
+            scheduleHtml = `
+                <div class="schedule-section">
+                    <h4>IMPLEMENTATION SCHEDULE (導入スケジュール)</h4>
+                    ${ganttHtml}
+                    ${taskTableHtml}
+                </div>
+            `;
+        }
+
+        return `
+            <h4>APPROACH (アプローチ)</h4>
+            <p>${(idea.approach || '').replace(/\n/g, '<br>')}</p>
+            <h4>RATIONALE (根拠)</h4>
+            <p>${(idea.rationale || '').replace(/\n/g, '<br>')}</p>
+            ${scheduleHtml}
+        `;
+    }
+
+    async function syncChanges() {
+        if (lastRevision === null) return;
 
         try {
-            const res = await fetch(`${API_UPDATE_CHECK}?last_timestamp=${encodeURIComponent(lastFetchedTimestamp)}`);
-            const data = await res.json();
-
-            if (data.has_updates) {
-                // Show banner
-                banner.style.display = 'flex';
-                // Trigger reflow to ensure transition runs
-                void banner.offsetWidth;
-                banner.classList.add('visible');
+            // Only ideas created/updated since our revision, plus tombstones
+            const res = await fetch(`${API_CHANGES}?since=${encodeURIComponent(lastRevision)}`);
+            const delta = await res.json();
+
+            if (delta.reset) {
+                // Too far behind for the tombstone window: reload everything
+                await fetchAndRenderIdeas();
+                return;
             }
+            applyDelta(delta.revision, delta.changed, delta.removed);
         } catch (e) {
-            console.error("Failed to check for updates", e);
+            console.error("Failed to sync changes", e);
+        }
+    }
+
+    function applyDelta(revision, changed, removed) {
+        // Pushed messages and polled deltas can arrive out of order
+        lastRevision = String(Math.max(Number(revision), Number(lastRevision || 0)));
+        if (changed.length === 0 && removed.length === 0) return;
+
+        const byId = new Map(currentIdeas.map(idea => [idea.id, idea]));
+        removed.forEach(id => {
+            byId.delete(id);
+            ideaDetails.delete(id);
+        });
+        changed.forEach(idea => {
+            byId.set(idea.id, idea);
+            // Deltas carry the full idea, which doubles as its detail
+            ideaDetails.set(idea.id, idea);
+        });
+        currentIdeas = Array.from(byId.values())
+            .sort((a, b) => (b.updated_at || '').localeCompare(a.updated_at || ''));
+
+        totalCountEl.textContent = currentIdeas.length;
+        if (currentIdeas.length > 0) loading.classList.add('hidden');
+        populateFilters();
+        renderFilteredGrid();
+
+        // Let the user know the grid changed underneath them
+        banner.style.display = 'flex';
+        void banner.offsetWidth;
+        banner.classList.add('visible');
+        setTimeout(() => banner.classList.remove('visible'), 5000);
+        setTimeout(() => { if (!banner.classList.contains('visible')) banner.style.display = 'none'; }, 5400);
+    }
+
+    // Polling is only the fallback for when the SSE stream is unavailable
+    function startPolling() {
+        if (pollingInterval) return;
+        pollingInterval = setInterval(syncChanges, 5000);
+        eventsInterval = setInterval(fetchEvents, 3000);
+    }
+
+    function stopPolling() {
+        clearInterval(pollingInterval);
+        clearInterval(eventsInterval);
+        pollingInterval = null;
+        eventsInterval = null;
+    }
+
+    function connectStream() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
         }
+        // EventSource reconnects by itself and sends Last-Event-ID to resume
+        const source = new EventSource(API_STREAM);
+        source.addEventListener('open', () => {
+            stopPolling();
+            // Catch up on anything that happened while we were not connected
+            syncChanges();
+            fetchEvents();
+        });
+        source.addEventListener('error', () => {
+            startPolling();
+            if (source.readyState === EventSource.CLOSED) {
+                // The browser gave up (e.g. non-200 response); retry later
+                setTimeout(connectStream, 30000);
+            }
+        });
+        source.addEventListener('idea-changed', e => {
+            const msg = JSON.parse(e.data);
+            applyDelta(msg.revision, [msg.idea], []);
+        });
+        source.addEventListener('idea-removed', e => {
+            const msg = JSON.parse(e.data);
+            applyDelta(msg.revision, [], [msg.id]);
+        });
+        source.addEventListener('new-event', e => {
+            prependEvent(JSON.parse(e.data));
+        });
+        source.addEventListener('reset', () => {
+            fetchAndRenderIdeas();
+            fetchEvents();
+        });
     }
 
     function scanForHighlights() {
@@ -347,57 +476,67 @@ document.addEventListener('DOMContentLoaded', () => {
     fetchAndRenderIdeas();
     fetchEvents();
 
-    // Poll for updates every 5 seconds without freezing GUI
-    pollingInterval = setInterval(checkForUpdates, 5000);
-    setInterval(fetchEvents, 3000); // Poll events frequently for the live feed feel
+    // Updates are pushed over SSE; falls back to polling changes every 5
+    // seconds and events every 3 seconds only while the stream is down
+    connectStream();
 
     // Update highlights every 30 seconds to remove expired highlights smoothly
     highlightInterval = setInterval(scanForHighlights, 30000);
 });
 
+let lastEventsEtag = null;
+let currentEvents = [];
+const MAX_EVENTS = 50;
+
 async function fetchEvents() {
     try {
         const res = await fetch('/api/events');
-        const events = await res.json();
-        const eventsList = document.getElementById('events-list');
-
-        if (events && events.length > 0) {
-            eventsList.innerHTML = events.map(e => `
-                <div class="event-item">
-                    <div class="event-time">${new Date(e.timestamp).toLocaleString('ja-JP', { hour: '2-digit', minute: '2-digit', second: '2-digit' })}</div>
-                    <div class="event-msg">${e.message}</div>
-                </div>
-            `).join('');
-        } else {
-            eventsList.innerHTML = '<p style="color:var(--text-secondary);font-size:0.85rem">まだ履歴がありません</p>';
-        }
+        const etag = res.headers.get('ETag');
+        if (etag && etag === lastEventsEtag) return;
+        lastEventsEtag = etag;
+        currentEvents = await res.json();
+        renderEvents();
     } catch (e) { console.error("Failed to fetch events", e); }
 }
 
-// Populate Filtering Dropdowns Dynamically
-function populateFilters(data) {
-    const modulesSet = new Set();
-    const audienceSet = new Set();
+function prependEvent(event) {
+    currentEvents = [event, ...currentEvents].slice(0, MAX_EVENTS);
+    // The list on screen is now newer than any cached /api/events response
+    lastEventsEtag = null;
+    renderEvents();
+}
 
-    data.forEach(item => {
-        if (item.modules) {
-            item.modules.split(',').forEach(m => modulesSet.add(m.trim()));
-        }
-        if (item.target_audience) {
-            item.target_audience.split('・').forEach(a => audienceSet.add(a.trim()));
-        }
-    });
+function renderEvents() {
+    const eventsList = document.getElementById('events-list');
+
+    if (currentEvents && currentEvents.length > 0) {
+        eventsList.innerHTML = currentEvents.map(e => `
+            <div class="event-item">
+                <div class="event-time">${new Date(e.timestamp).toLocaleString('ja-JP', { hour: '2-digit', minute: '2-digit', second: '2-digit' })}</div>
+                <div class="event-msg">${e.message}</div>
+            </div>
+        `).join('');
+    } else {
+        eventsList.innerHTML = '<p style="color:var(--text-secondary);font-size:0.85rem">まだ履歴がありません</p>';
+    }
+}
 
-    const moduleSelect = document.getElementById('filter-module');
-    // Keep 'all' option, remove others
-    while (moduleSelect.options.length > 1) { moduleSelect.remove(1); }
-    modulesSet.forEach(m => {
-        moduleSelect.add(new Option(m, m));
-    });
+// Populate Filtering Dropdowns from the server's precomputed facets
+async function populateFilters() {
+    try {
+        const res = await fetch('/api/facets');
+        const facets = await res.json();
+        fillFilterOptions(document.getElementById('filter-module'), facets.module || []);
+        fillFilterOptions(document.getElementById('filter-audience'), facets.audience || []);
+    } catch (e) { console.error("Failed to fetch facets", e); }
+}
 
-    const audienceSelect = document.getElementById('filter-audience');
-    while (audienceSelect.options.length > 1) { audienceSelect.remove(1); }
-    audienceSet.forEach(a => {
-        audienceSelect.add(new Option(a, a));
+function fillFilterOptions(select, options) {
+    const selected = select.value;
+    // Keep 'all' option, remove others
+    while (select.options.length > 1) { select.remove(1); }
+    options.forEach(o => {
+        select.add(new Option(`${o.value} (${o.count})`, o.value));
     });
+    if (options.some(o => o.value === selected)) select.value = selected;
 }
@@ -5,7 +5,12 @@ import threading
 import asyncio
 from datetime import datetime, timezone
 import re
-from ai_worker import run_ai_simulation
+from collections import OrderedDict
+from ai_worker import EMBEDDED_WORKER, run_as_leader
+from idea_store import get_store
+from idea_index import get_index
+from search_index import get_search_index
+from event_log import get_event_log
 
 # --- Page Config ---
 # Must be the very first Streamlit command
@@ -18,12 +23,17 @@ st.set_page_config(
 
 # --- Initialization & Background Worker ---
 
-# Start background AI simulation in a separate thread, running an asyncio loop
+# Start background AI simulation in a separate thread, running an asyncio loop.
+# Every Streamlit (and web) process is a candidate, but only the holder of the
+# worker lease simulates; with EMBEDDED_WORKER=0 this process only reads.
 @st.cache_resource
 def start_worker():
+    if not EMBEDDED_WORKER:
+        return None
+
     def _run():
         try:
-            asyncio.run(run_ai_simulation())
+            asyncio.run(run_as_leader())
         except Exception as e:
             print(f"Background worker failed: {e}")
             
@@ -35,82 +45,154 @@ def start_worker():
 start_worker()
 
 # --- CSS Injection ---
+CSS_FILE = "static/style.css"
+
+# Read and minified once per change of the stylesheet, not on every rerun
+@st.cache_data(max_entries=1)
+def minified_css(mtime):
+    with open(CSS_FILE, "r", encoding="utf-8") as f:
+        css = f.read()
+
+    # Add Streamlit-specific overrides to make the app feel like the custom UI
+    st_overrides = """
+    <style>
+    /* Hide default Streamlit header */
+    header[data-testid="stHeader"] { display: none; }
+    
+    /* Maximize width and fix padding */
+    .block-container {
+        padding-top: 1rem !important;
+        max-width: 1400px !important;
+    }
+    
+    /* Streamlit background matching */
+    .stApp {
+        background-color: #0b0f19;
+    }
+    
+    /* Details/Summary implementation for the toggle feature to mimic button */
+    details.idea-details {
+        margin-top: 15px;
+    }
+    details.idea-details summary {
+        cursor: pointer;
+        padding: 8px 12px;
+        color: var(--text-muted);
+        font-size: 0.9rem;
+        border: 1px solid var(--border-color);
+        border-radius: 4px;
+        background: rgba(255, 255, 255, 0.03);
+        display: block;
+        text-align: center;
+        transition: all 0.2s ease;
+        list-style: none;
+    }
+    details.idea-details summary::-webkit-details-marker {
+        display: none;
+    }
+    details.idea-details summary:hover {
+        border-color: var(--primary);
+        color: var(--primary);
+        background: rgba(100, 255, 218, 0.05);
+    }
+    details.idea-details[open] summary::before { content: "詳細を閉じる ▲"; }
+    details.idea-details:not([open]) summary::before { content: "詳細を見る ▼"; }
+    
+    .card-details {
+        padding-top: 15px;
+        margin-top: 15px;
+        border-top: 1px dashed var(--border-color);
+    }
+    </style>
+    """
+    return re.sub(r'\n\s*', '', f"<style>{css}</style>{st_overrides}")
+
 def load_css():
     try:
-        with open("static/style.css", "r", encoding="utf-8") as f:
-            css = f.read()
-            
-        # Add Streamlit-specific overrides to make the app feel like the custom UI
-        st_overrides = """
-        <style>
-        /* Hide default Streamlit header */
-        header[data-testid="stHeader"] { display: none; }
-        
-        /* Maximize width and fix padding */
-        .block-container {
-            padding-top: 1rem !important;
-            max-width: 1400px !important;
-        }
-        
-        /* Streamlit background matching */
-        .stApp {
-            background-color: #0b0f19;
-        }
-        
-        /* Details/Summary implementation for the toggle feature to mimic button */
-        details.idea-details {
-            margin-top: 15px;
-        }
-        details.idea-details summary {
-            cursor: pointer;
-            padding: 8px 12px;
-            color: var(--text-muted);
-            font-size: 0.9rem;
-            border: 1px solid var(--border-color);
-            border-radius: 4px;
-            background: rgba(255, 255, 255, 0.03);
-            display: block;
-            text-align: center;
-            transition: all 0.2s ease;
-            list-style: none;
-        }
-        details.idea-details summary::-webkit-details-marker {
-            display: none;
-        }
-        details.idea-details summary:hover {
-            border-color: var(--primary);
-            color: var(--primary);
-            background: rgba(100, 255, 218, 0.05);
-        }
-        details.idea-details[open] summary::before { content: "詳細を閉じる ▲"; }
-        details.idea-details:not([open]) summary::before { content: "詳細を見る ▼"; }
-        
-        .card-details {
-            padding-top: 15px;
-            margin-top: 15px;
-            border-top: 1px dashed var(--border-color);
-        }
-        </style>
-        """
-        st.markdown(re.sub(r'\n\s*', '', f"<style>{css}</style>{st_overrides}"), unsafe_allow_html=True)
+        st.markdown(minified_css(os.path.getmtime(CSS_FILE)), unsafe_allow_html=True)
     except Exception as e:
         st.error(f"Failed to load CSS: {e}")
 
 load_css()
 
 # --- Data Loading ---
-def load_ideas():
-    if not os.path.exists("ideas.json"):
-        return []
-    with open("ideas.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return sorted(data, key=lambda x: x.get("updated_at", ""), reverse=True)
-
-def load_events():
-    if not os.path.exists("events.json"):
-        return []
-    with open("events.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+# Streamlit reruns this whole script on every widget interaction, so what
+# it reads is cached across reruns and sessions and recomputed only when
+# its source changes: the event log's version, the store's revision.
+
+# Filtered grids kept per revision (each filter / sort / query combination)
+GRID_CACHE_ENTRIES = 16
+
+class DashboardData:
+    """
+    Ideas by id and their rendered cards, kept in step with the store's
+    changes feed like IdeaIndex: a write re-renders only the cards it
+    touched. The grid HTML of each filter combination is memoized until the
+    next write, so switching back to a filter is a dictionary lookup.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.revision = self.store.revision()
+        self.ideas = {i["id"]: i for i in self.store.all()}
+        self._cards = {}
+        self._grids = OrderedDict()
+
+    def refresh(self):
+        """Applies store changes since the last refresh."""
+        if self.store.revision() == self.revision:
+            return
+        with self._lock:
+            delta = self.store.changes(self.revision)
+            if delta["reset"]:
+                self._rebuild()
+                return
+            for idea_id in delta["removed"]:
+                self.ideas.pop(idea_id, None)
+                self._cards.pop(idea_id, None)
+            for idea in delta["changed"]:
+                self.ideas[idea["id"]] = idea
+                self._cards.pop(idea["id"], None)
+            self._grids.clear()
+            self.revision = delta["revision"]
+
+    def grid(self, key, find_ids):
+        """
+        (count, grid HTML) of the ideas find_ids() returns, in that order;
+        find_ids only runs when `key` is not memoized for this revision.
+        """
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is not None:
+                self._grids.move_to_end(key)
+                return grid
+            cards = []
+            for idea_id in find_ids():
+                if idea_id not in self.ideas:
+                    continue
+                card = self._cards.get(idea_id)
+                if card is None:
+                    card = self._cards[idea_id] = render_idea_card(self.ideas[idea_id])
+                cards.append(card)
+            grid = (len(cards), f'<div class="ideas-grid">{"".join(cards)}</div>')
+            self._grids[key] = grid
+            if len(self._grids) > GRID_CACHE_ENTRIES:
+                self._grids.popitem(last=False)
+            return grid
+
+@st.cache_resource
+def get_dashboard_data():
+    # One per process, shared by every session
+    return DashboardData(get_store())
+
+@st.cache_data(max_entries=1)
+def load_events(version):
+    # `version` (the event log's change token) is the cache key
+    return get_event_log().latest()
 
 # --- Components ---
 def create_gantt_html(schedule):
@@ -195,70 +277,9 @@ def render_idea_card(idea):
         </div>
         """
 
-    raw_schedule = idea.get('schedule', {})
-    schedule_data = {}
-    
-    if isinstance(raw_schedule, dict):
-        schedule_data = raw_schedule
-    elif isinstance(raw_schedule, list):
-        durations = len(raw_schedule)
-        tracks = [
-            {"name": "全体スケジュール", "items": []},
-            {"name": "ベンダー（導入）", "items": []},
-            {"name": "企業側(人事・情シス)", "items": []}
-        ]
-        tasks = []
-        for i, phase in enumerate(raw_schedule):
-            m = i + 1
-            phase_name = phase.get('phase') or phase.get('month') or f"Phase {m}"
-            tracks[0]["items"].append({
-                "name": phase_name,
-                "start": m,
-                "end": m
-            })
-            
-            v_tasks = []
-            c_tasks = []
-            
-            for t in phase.get('tasks', []):
-                new_t = t.copy()
-                new_t['phase'] = phase_name
-                
-                actor = new_t.get('actor', '')
-                if not actor and 'raci' in new_t:
-                    raci_str = new_t['raci']
-                    v_match = re.search(r'V:\s*([A-Za-z,]+)', raci_str)
-                    c_match = re.search(r'C:\s*([A-Za-z,]+)', raci_str)
-                    v_ar = bool(v_match and ('A' in v_match.group(1) or 'R' in v_match.group(1)))
-                    c_ar = bool(c_match and ('A' in c_match.group(1) or 'R' in c_match.group(1)))
-                    
-                    if v_ar and c_ar:
-                        actor = '全体'
-                    elif v_ar:
-                        actor = 'ベンダー'
-                    elif c_ar:
-                        actor = '顧客'
-                    else:
-                        actor = '全体'
-                        
-                new_t['actor'] = actor
-                tasks.append(new_t)
-                
-                if actor == 'ベンダー':
-                    v_tasks.append(new_t.get('name', ''))
-                elif actor == '顧客':
-                    c_tasks.append(new_t.get('name', ''))
-                    
-            if v_tasks:
-                tracks[1]["items"].append({"name": " / ".join(v_tasks), "start": m, "end": m})
-            if c_tasks:
-                tracks[2]["items"].append({"name": " / ".join(c_tasks), "start": m, "end": m})
-        
-        schedule_data = {
-            "durations": durations,
-            "tracks": tracks,
-            "tasks": tasks
-        }
+    # Stored in the canonical shape (idea_model.Schedule): tracks of month
+    # bars plus tasks with their actor, or {} without a schedule
+    schedule_data = idea.get('schedule') or {}
         
     tasks = schedule_data.get('tasks', [])
     task_html = ""
@@ -309,9 +330,10 @@ def render_idea_card(idea):
         return str(val).replace('\n', '<br>')
 
     card_html = f"""
-    <div class="card" data-updated-at="{idea.get('updated_at', '')}">
+    <div class="card{' draft' if idea.get('draft') else ''}" data-updated-at="{idea.get('updated_at', '')}">
         <div class="card-header">
             <span class="persona-badge">{idea.get('persona', 'Unknown')}</span>
+            {'<span class="draft-badge"><i class="fas fa-pen"></i> 生成中 (ドラフト)</span>' if idea.get('draft') else ''}
             <span class="cost-badge">{idea.get('cost', 'コスト未定')}</span>
         </div>
         <h3 class="card-title">{idea.get('title', 'No Title')}</h3>
@@ -361,28 +383,23 @@ def render_idea_card(idea):
 
 # --- Main Application ---
 def main():
-    ideas = load_ideas()
-    events = load_events()
+    data = get_dashboard_data()
+    data.refresh()
+    events = load_events(get_event_log().version())
     
     # Render Streamlit Sidebar Filters
     st.sidebar.title("フィルター & ソート")
     st.sidebar.markdown("---")
     
-    # Safely extract unique targets (handling strings or lists)
-    raw_targets = []
-    raw_modules = []
-    for i in ideas:
-        t = i.get("target")
-        if t:
-            raw_targets.extend(t if isinstance(t, list) else [t])
-        m = i.get("modules")
-        if m:
-            raw_modules.extend(m if isinstance(m, list) else [m.strip() for m in str(m).split(",")])
-            
-    target_options = ["すべて"] + sorted(list(set(raw_targets)))
+    query = st.sidebar.text_input("キーワード検索", placeholder="タイトル・アプローチ・根拠・レビュー").strip()
+    
+    # Options come precomputed (and sorted) from the inverted indexes
+    index = get_index()
+    facets = index.facets()
+    target_options = ["すべて"] + [f["value"] for f in facets["target"]]
     sel_target = st.sidebar.selectbox("ターゲット", target_options)
     
-    module_options = ["すべて"] + sorted(list(set(raw_modules)))
+    module_options = ["すべて"] + [f["value"] for f in facets["module"]]
     sel_module = st.sidebar.selectbox("モジュール", module_options)
     
     sort_options = {
@@ -396,19 +413,20 @@ def main():
     if st.sidebar.button("↻ データを再読み込み", use_container_width=True):
         st.rerun()
 
-    # Filtering Logic
-    filtered_ideas = ideas
-    if sel_target != "すべて":
-        filtered_ideas = [i for i in filtered_ideas if sel_target in (i.get("target") if isinstance(i.get("target"), list) else [i.get("target")])]
-    if sel_module != "すべて":
-        filtered_ideas = [i for i in filtered_ideas if sel_module in (i.get("modules") if isinstance(i.get("modules"), list) else [m.strip() for m in str(i.get("modules")).split(",")])]
-        
-    sort_type = sort_options[sel_sort]
-    if sort_type == "desc":
-        filtered_ideas = sorted(filtered_ideas, key=lambda x: (x.get("recommendation_score", 0), x.get("updated_at", "")), reverse=True)
-    elif sort_type == "asc":
-        filtered_ideas = sorted(filtered_ideas, key=lambda x: (x.get("recommendation_score", 0), x.get("updated_at", "")))
-    # default is already sorted by updated_at desc during load
+    # Filtering Logic: set intersection + precomputed sort order from the index
+    def find_ids():
+        filtered_ids, _ = index.query(
+            sort=sort_options[sel_sort],
+            target=None if sel_target == "すべて" else sel_target,
+            module=None if sel_module == "すべて" else sel_module,
+        )
+        if query:
+            # Keyword search: keep the filtered ideas that match, best match first
+            allowed = set(filtered_ids)
+            filtered_ids = [i for i, _ in get_search_index().search(query, None) if i in allowed]
+        return filtered_ids
+
+    shown, grid_html = data.grid((sel_sort, sel_target, sel_module, query), find_ids)
 
     # Render Main Dashboard Header
     st.markdown("""
@@ -425,8 +443,8 @@ def main():
     # Render Metrics
     col1, col2, col3 = st.columns(3)
     col1.metric("稼働中のAI", "6名", "Active")
-    col2.metric("総提案数", f"{len(ideas)}件")
-    col3.metric("表示中", f"{len(filtered_ideas)}件")
+    col2.metric("総提案数", f"{len(data.ideas)}件")
+    col3.metric("表示中", f"{shown}件")
     
     # Render AI Sequence Diagram / Events List (Horizontal)
     st.markdown("### <i class='fas fa-history' style='color:#ff6464;'></i> LIVE: AI検討履歴", unsafe_allow_html=True)
@@ -454,14 +472,9 @@ def main():
         
     # Render Ideas Grid
     st.markdown("---")
-    if not filtered_ideas:
+    if not shown:
         st.warning("条件に一致するアイディアがありません。")
     else:
-        grid_html = '<div class="ideas-grid">'
-        for idea in filtered_ideas:
-            grid_html += render_idea_card(idea)
-        grid_html += "</div>"
-        
         st.markdown(grid_html, unsafe_allow_html=True)
 
 if __name__ == "__main__":
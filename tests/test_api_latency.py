@@ -0,0 +1,122 @@
+"""
+Regression test: an LLM generation in flight must not stall the API.
+
+The embedded worker runs on the web server's event loop, so a blocking
+LLM round trip (or blocking store I/O around it) would hold every request
+until the model answers. A stub client that takes LLM_DELAY_SECONDS to
+stream its answer is started on the TestClient's own loop, and /api/ideas
+is polled meanwhile: its p99 has to stay far below the LLM delay.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH_DIR = tempfile.mkdtemp(prefix="api-latency-")
+# Read at import by the stores and the worker; the app serves static/ relative to the repo
+os.environ.update({
+    "IDEAS_DB": os.path.join(SCRATCH_DIR, "ideas.db"),
+    "EVENTS_DIR": os.path.join(SCRATCH_DIR, "events.d"),
+    "LLM_CACHE_DB": os.path.join(SCRATCH_DIR, "llm_cache.db"),
+    "EMBEDDED_WORKER": "0",
+    "AI_RPM": "0",
+    "AI_TPM": "0",
+})
+os.chdir(REPO_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import ai_worker  # noqa: E402
+import app  # noqa: E402
+
+LLM_DELAY_SECONDS = 3.0
+LLM_CHUNKS = 6
+# Far below one chunk's delay: a blocked loop shows up as stalls of LLM_DELAY_SECONDS / LLM_CHUNKS
+P99_BOUND_SECONDS = 0.25
+MIN_SAMPLES = 20
+
+ANSWER = {
+    "title": "スタブ生成アイディア",
+    "target": "新規開拓",
+    "modules": "Employee Central",
+    "approach": "【課題】テスト。\n\n【解決案】テスト。",
+    "rationale": "テスト",
+    "viewpoint": "テスト",
+    "difficulty": "低難易度",
+    "reference": "",
+    "recommendation_score": 4,
+    "schedule": [],
+    "cost": "約100万円",
+}
+
+
+class SlowModels:
+    """Stands in for client.aio.models: answers after LLM_DELAY_SECONDS, without blocking the loop."""
+
+    def __init__(self):
+        self.started = threading.Event()
+
+    async def generate_content(self, model, contents, config):
+        self.started.set()
+        await asyncio.sleep(LLM_DELAY_SECONDS)
+        return SimpleNamespace(text=json.dumps(ANSWER, ensure_ascii=False), usage_metadata=None)
+
+    async def generate_content_stream(self, model, contents, config):
+        text = json.dumps(ANSWER, ensure_ascii=False)
+        step = -(-len(text) // LLM_CHUNKS)
+
+        async def chunks():
+            self.started.set()
+            for i in range(0, len(text), step):
+                await asyncio.sleep(LLM_DELAY_SECONDS / LLM_CHUNKS)
+                yield SimpleNamespace(text=text[i:i + step], usage_metadata=None)
+
+        return chunks()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def test_api_latency_unaffected_by_generation_in_flight(monkeypatch):
+    models = SlowModels()
+    monkeypatch.setattr(ai_worker, "client", SimpleNamespace(aio=SimpleNamespace(models=models)), raising=False)
+    # Only present when google-genai is installed
+    monkeypatch.setattr(ai_worker, "types", SimpleNamespace(GenerateContentConfig=lambda **kw: kw), raising=False)
+    monkeypatch.setattr(ai_worker, "USE_AI", True)
+
+    with TestClient(app.app) as client:
+        assert client.get("/api/ideas").status_code == 200  # warm the snapshot cache
+
+        # On the app's own event loop, where the embedded worker runs
+        generation = client.portal.start_task_soon(ai_worker.generate_idea_ai, ai_worker.PERSONAS[0])
+        assert models.started.wait(5), "the stub LLM was never called"
+
+        latencies = []
+        while not generation.done():
+            started = time.perf_counter()
+            response = client.get("/api/ideas")
+            elapsed = time.perf_counter() - started
+            if not generation.done():
+                assert response.status_code == 200
+                latencies.append(elapsed)
+
+        idea = generation.result(timeout=LLM_DELAY_SECONDS * 2)
+
+    # The stub's answer, not the mock fallback
+    assert idea["title"] == ANSWER["title"]
+    assert len(latencies) >= MIN_SAMPLES
+    p99 = percentile(latencies, 99)
+    assert p99 < P99_BOUND_SECONDS, f"/api/ideas p99 {p99:.3f}s while a {LLM_DELAY_SECONDS}s generation was in flight"
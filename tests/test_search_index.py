@@ -0,0 +1,22 @@
+"""
+Regression test: a one-character query matches the character both as a
+standalone run (indexed as a unigram) and inside longer runs (bigrams).
+"""
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from idea_store import IdeaStore  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+
+
+def test_single_character_query_matches_unigrams_and_bigrams(tmp_path):
+    store = IdeaStore(str(tmp_path / "ideas.db"))
+    store.upsert({"id": "a", "title": "人事の課題"})
+    store.upsert({"id": "b", "title": "人、組織"})
+
+    found = {idea_id for idea_id, _ in SearchIndex(store).search("人")}
+
+    assert found == {"a", "b"}